@@ -0,0 +1,102 @@
+# my_network_automation/utilities/parsers.py
+# Turns CLI "show" output into structured data with the ntc-templates TextFSM templates.
+#
+# ntc_templates.parse.parse_output() re-reads the template index, searches it and compiles
+# the TextFSM template on every call. Here each of those steps is done once and cached:
+#   - the template index (one CliTable per template directory)
+#   - the index lookup per (platform, command)
+#   - the compiled TextFSM template (per thread, because a TextFSM object holds parse state)
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import ntc_templates
+import textfsm
+from ntc_templates.parse import ParsingException, parse_output
+from textfsm import clitable
+
+
+def _template_dir():
+    """Same lookup as ntc-templates: $NTC_TEMPLATES_DIR, else the templates shipped with the package."""
+    return os.environ.get("NTC_TEMPLATES_DIR") or os.path.join(os.path.dirname(ntc_templates.__file__), "templates")
+
+
+@lru_cache(maxsize=None)
+def _index_table(template_dir):
+    """Loads the template index file once per template directory."""
+    return clitable.CliTable("index", template_dir).index
+
+
+@lru_cache(maxsize=4096)
+def _template_paths(platform, command, template_dir):
+    """Returns the template file paths the index maps (platform, command) to."""
+    index = _index_table(template_dir)
+    row = index.GetRowMatch({"Command": command, "Platform": platform})
+    if not row:
+        raise ParsingException(f'Unable to parse command "{command}" on platform {platform} - no template found')
+    return tuple(os.path.join(template_dir, name) for name in index.index[row]["Template"].split(":"))
+
+
+_compiled = threading.local()
+
+def _compiled_template(template_path):
+    """Returns this thread's compiled TextFSM object for a template, compiling it on first use."""
+    cache = getattr(_compiled, "templates", None)
+    if cache is None:
+        cache = _compiled.templates = {}
+    fsm = cache.get(template_path)
+    if fsm is None:
+        with open(template_path) as template_file:
+            fsm = cache[template_path] = textfsm.TextFSM(template_file)
+    return fsm
+
+
+def parse_show_output(platform, command, data, template_dir=None):
+    """
+    Parses the output of a show command, e.g. parse_show_output("cisco_ios", "show ip interface brief", output).
+    Returns a list of dicts with lower-case keys, same as ntc_templates.parse.parse_output.
+    Raises ParsingException if there is no template for the command or the template fails.
+    """
+    template_dir = template_dir or _template_dir()
+    template_paths = _template_paths(platform, command, template_dir)
+    if len(template_paths) > 1:
+        # Commands that merge several templates are rare; let ntc-templates do the merge
+        return parse_output(platform=platform, command=command, data=data, template_dir=template_dir)
+
+    fsm = _compiled_template(template_paths[0])
+    fsm.Reset()
+    try:
+        rows = fsm.ParseText(data)
+    except textfsm.TextFSMError as err:
+        raise ParsingException(f'Unable to parse command "{command}" on platform {platform} - {err}') from err
+    header = [column.lower() for column in fsm.header]
+    return [dict(zip(header, row)) for row in rows]
+
+
+def _parse_item(item):
+    platform, command, data = item
+    try:
+        return parse_show_output(platform, command, data)
+    except ParsingException as err:
+        return err
+
+
+def parse_many(items, processes=None, chunksize=256):
+    """
+    Parses many outputs across a process pool.
+    items: iterable of (platform, command, output) tuples.
+    Returns a list in the same order; an item that could not be parsed gives its ParsingException
+    instead of a list of dicts. Each worker process keeps its own template caches, so large
+    chunks (chunksize) mean each template is compiled only once per worker.
+    """
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(_parse_item, items, chunksize=chunksize))
+
+
+def parse_interface_status(raw_output, platform="cisco_ios"):
+    """
+    Parses "show ip interface brief" output into a list of dicts
+    (interface, ip_address, status, proto, ...).
+    """
+    return parse_show_output(platform, "show ip interface brief", raw_output)
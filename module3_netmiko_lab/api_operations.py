@@ -0,0 +1,66 @@
+# api_operations.py
+# RESTCONF and NETCONF operations that take the device as a parameter, so
+# async_engine.AsyncDeviceEngine can run them on many devices:
+#
+#     engine.run_all(iosxe_devices, restconf_get("Cisco-IOS-XE-process-cpu-oper:cpu-usage"), protocol="restconf")
+#
+# Device dictionaries use the same keys as the Netmiko ones (host, username, password), plus
+# optional restconf_port (default 443), netconf_port (default 830) and verify_ssl (default False).
+import threading
+import requests
+import urllib3
+from ncclient import manager
+
+urllib3.disable_warnings()
+
+API_TIMEOUT = (5, 15) # Seconds to connect, seconds to wait for the reply
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def _restconf_session(device_info):
+    """One keep-alive requests.Session per device, so repeated calls reuse the TLS connection."""
+    key = (device_info["host"], device_info.get("restconf_port", 443), device_info["username"])
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = requests.Session()
+            session.auth = (device_info["username"], device_info["password"])
+            session.verify = device_info.get("verify_ssl", False)
+        return session
+
+def restconf_get(path):
+    """
+    Returns an operation(device_info) that GETs /restconf/data/<path> from the device and returns the JSON reply.
+    HTTP errors and timeouts are raised (the engine records them as failed results).
+    """
+    def operation(device_info):
+        url = f"https://{device_info['host']}:{device_info.get('restconf_port', 443)}/restconf/data/{path}"
+        response = _restconf_session(device_info).get(
+            url,
+            headers={"Accept": "application/yang-data+json"},
+            timeout=API_TIMEOUT
+        )
+        response.raise_for_status()
+        return response.json()
+    operation.__name__ = f"restconf_get {path}"
+    return operation
+
+def netconf_get(xml_filter):
+    """
+    Returns an operation(device_info) that sends a NETCONF <get> with this subtree filter
+    and returns the reply XML as a string.
+    """
+    def operation(device_info):
+        with manager.connect(host=device_info["host"],
+                             port=device_info.get("netconf_port", 830),
+                             username=device_info["username"],
+                             password=device_info["password"],
+                             hostkey_verify=False, # Set to True in production with proper host keys
+                             device_params={"name": "iosxe"},
+                             allow_agent=False,
+                             look_for_keys=False,
+                             timeout=API_TIMEOUT[1]) as m:
+            return m.get(filter=("subtree", xml_filter)).xml
+    operation.__name__ = "netconf_get"
+    return operation
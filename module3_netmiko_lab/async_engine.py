@@ -0,0 +1,129 @@
+# async_engine.py
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from results import as_result, failed_result
+
+DEFAULT_MAX_THREADS = 64 # Blocking calls (Netmiko, ncclient, requests) running at the same time
+DEFAULT_PER_SITE_LIMIT = 50 # Jobs running at the same time per site (WAN link, jump host, TACACS server)
+DEFAULT_PER_DEVICE_LIMIT = 2 # Jobs running at the same time per device (vty lines); same as the connection pool
+
+
+def device_site(device_info):
+    """Site a device belongs to: its "site" key, or "default"."""
+    return device_info.get("site", "default")
+
+
+class AsyncDeviceEngine:
+    """
+    Runs device operations as asyncio coroutines, like the gather() examples in asyncio_lab.py.
+
+    An operation is either:
+      - a coroutine function, operation(device_info), e.g. using an async SSH/HTTP library: it runs on the event loop
+      - a plain blocking function (the netmiko_operations helpers, or the RESTCONF/NETCONF operations
+        from api_operations.py): it runs on a bounded thread pool (max_threads) and the coroutine awaits it
+
+    Every job is a cheap coroutine waiting on semaphores, so 10,000+ queued devices cost no
+    threads; only max_threads blocking calls run at once. Per-site and per-device semaphores
+    keep a big job from flooding one site or running out of a router's vty lines.
+
+        engine = AsyncDeviceEngine(max_threads=100)
+        results = engine.run_all(multi_devices, backup_running_config)
+        results = engine.run_all(iosxe_devices, restconf_get("Cisco-IOS-XE-process-cpu-oper:cpu-usage"), protocol="restconf")
+
+    Each job returns a DeviceResult (see results.py). When run() is awaited directly (not through
+    run_many/run_all), call close() afterwards to stop the engine's threads.
+    """
+
+    def __init__(self, max_threads=DEFAULT_MAX_THREADS, per_site_limit=DEFAULT_PER_SITE_LIMIT,
+                 per_device_limit=DEFAULT_PER_DEVICE_LIMIT, site_of=device_site):
+        self.max_threads = max_threads
+        self.per_site_limit = per_site_limit
+        self.per_device_limit = per_device_limit
+        self.site_of = site_of
+        self._site_semaphores = {}
+        self._device_semaphores = {}
+        self._executor = None
+
+    def _semaphore(self, semaphores, key, limit):
+        # Created on first use, inside the running loop (asyncio objects belong to one loop)
+        semaphore = semaphores.get(key)
+        if semaphore is None:
+            semaphore = semaphores[key] = asyncio.Semaphore(limit)
+        return semaphore
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_threads)
+        return self._executor
+
+    def close(self):
+        """Stops the thread pool (it is created again on the next run)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, device_info, operation, protocol="ssh"):
+        """Runs one operation on one device and returns a DeviceResult. Never raises for device errors."""
+        host = device_info.get("host", "Unknown Host")
+        name = getattr(operation, "__name__", str(operation))
+        submitted_at = time.monotonic()
+        device_slot = self._semaphore(self._device_semaphores, host, self.per_device_limit)
+        site_slot = self._semaphore(self._site_semaphores, self.site_of(device_info), self.per_site_limit)
+
+        # Device slot first, so a job waiting for a busy device doesn't hold one of the site's slots
+        async with device_slot, site_slot:
+            started_at = time.monotonic()
+            try:
+                if asyncio.iscoroutinefunction(operation):
+                    output = await operation(device_info)
+                else:
+                    loop = asyncio.get_running_loop()
+                    output = await loop.run_in_executor(self._get_executor(), operation, device_info)
+                result = as_result(output, host, protocol, name)
+            except Exception as e:
+                result = failed_result(host, protocol, name, str(e), e)
+            result.queue_time = started_at - submitted_at
+            result.wall_time = time.monotonic() - started_at
+        return result
+
+    async def run_many(self, jobs):
+        """
+        Runs (device_info, operation, protocol) jobs concurrently.
+        Async generator: yields each DeviceResult as soon as its job finishes.
+        """
+        owns_executor = self._executor is None
+        self._get_executor()
+        tasks = []
+        try:
+            tasks = [asyncio.ensure_future(self.run(device_info, operation, protocol))
+                     for device_info, operation, protocol in jobs]
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel() # Only has an effect if the caller stopped early
+            if owns_executor:
+                self.close()
+
+    def run_all(self, devices, operation, protocol="ssh"):
+        """Blocking helper: runs one operation on every device and returns the list of DeviceResults."""
+        # asyncio semaphores belong to the loop they were first used in, and asyncio.run() makes a new loop
+        self._site_semaphores.clear()
+        self._device_semaphores.clear()
+
+        async def collect():
+            return [result async for result in self.run_many((d, operation, protocol) for d in devices)]
+        return asyncio.run(collect())
+
+
+if __name__ == "__main__":
+    from devices import multi_devices
+    from netmiko_operations import backup_running_config
+
+    start_time = time.time()
+    engine = AsyncDeviceEngine(max_threads=10)
+    for result in engine.run_all(multi_devices, backup_running_config):
+        print(f"[{result.host}] {result.status} (queued {result.queue_time:.2f}s, ran {result.wall_time:.2f}s)")
+        print(result)
+    print(f"Total time: {time.time() - start_time:.2f} seconds")
@@ -0,0 +1,163 @@
+# backup_store.py
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+
+DEFAULT_BACKUP_DIR = "backups"
+
+# Lines that change on every "show running-config" even when the configuration itself did not.
+# They are removed before hashing so an unchanged device always produces the same hash.
+VOLATILE_LINE_PATTERNS = [
+    re.compile(r"^Building configuration"),
+    re.compile(r"^Current configuration\s*:"),
+    re.compile(r"^!!? ?Last configuration change"), # "!! Last configuration change ..." on IOS XR
+    re.compile(r"^! NVRAM config last updated"),
+    re.compile(r"^! No configuration change since last restart"),
+    re.compile(r"^!! IOS XR Configuration"),
+    # IOS XR prints the time before every command's output, e.g. "Thu Oct  9 15:22:39.102 UTC"
+    re.compile(r"^(Mon|Tue|Wed|Thu|Fri|Sat|Sun) (Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec) +\d{1,2} "
+               r"\d{2}:\d{2}:\d{2}(\.\d+)? \S+$"),
+    re.compile(r"^!Time:"), # NX-OS prints the time at the top of the running-config
+    re.compile(r"^ntp clock-period"),
+]
+
+
+def normalize_config(running_config):
+    """
+    Returns the running-config without volatile lines and trailing whitespace.
+    This is the text that gets hashed and stored.
+    """
+    lines = []
+    for line in running_config.splitlines():
+        line = line.rstrip()
+        if any(pattern.match(line) for pattern in VOLATILE_LINE_PATTERNS):
+            continue
+        lines.append(line)
+    return "\n".join(lines).strip("\n") + "\n"
+
+
+def config_hash(normalized_config):
+    """SHA-256 of a normalized config, used as its name in the store."""
+    return hashlib.sha256(normalized_config.encode("utf-8")).hexdigest()
+
+
+def _safe_name(host):
+    # Keep host names usable as file names (IPv6 addresses contain ':')
+    return re.sub(r"[^\w.-]", "_", host)
+
+
+class BackupStore:
+    """
+    Content-addressed store for running-config backups.
+
+    Every unique (normalized) config is written once, gzip-compressed, to
+    objects/<first 2 hash chars>/<hash>.gz. Each host has an append-only index file
+    index/<host>.jsonl with one {"host", "timestamp", "sha256"} line per backup run, so a device
+    whose config didn't change only costs one short index line per backup.
+    """
+
+    def __init__(self, root=DEFAULT_BACKUP_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.index_dir = os.path.join(root, "index")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.index_dir, exist_ok=True)
+        self._index_lock = threading.Lock()
+
+    def _object_path(self, sha):
+        return os.path.join(self.objects_dir, sha[:2], f"{sha}.gz")
+
+    def _index_path(self, host):
+        return os.path.join(self.index_dir, f"{_safe_name(host)}.jsonl")
+
+    def save(self, host, running_config, change_marker=None, timestamp=None):
+        """
+        Stores a running-config for a host.
+        change_marker is the device's own "last change" information at backup time (see
+        netmiko_operations.get_config_change_marker); it lets the next run skip the full pull.
+        Returns (sha256, is_new) where is_new is False when the same config was already stored.
+        """
+        normalized = normalize_config(running_config)
+        sha = config_hash(normalized)
+        object_path = self._object_path(sha)
+        is_new = not os.path.exists(object_path)
+        if is_new:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            # Write to a temporary file first so a crash never leaves a half-written object
+            tmp_path = f"{object_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                f.write(normalized)
+            os.replace(tmp_path, object_path)
+
+        self.record(host, sha, change_marker=change_marker, timestamp=timestamp)
+        return sha, is_new
+
+    def record(self, host, sha, change_marker=None, timestamp=None):
+        """
+        Appends an index entry for a host pointing at an already stored config.
+        Also used to log a backup run that was skipped because the device reported no change.
+        """
+        if timestamp is None:
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        entry = {"host": host, "timestamp": timestamp, "sha256": sha}
+        if change_marker is not None:
+            entry["change_marker"] = change_marker
+        with self._index_lock:
+            with open(self._index_path(host), "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def history(self, host):
+        """Returns the list of index entries for a host, oldest first."""
+        index_path = self._index_path(host)
+        if not os.path.exists(index_path):
+            return []
+        with open(index_path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def latest(self, host):
+        """Returns the newest index entry for a host, or None if it was never backed up."""
+        history = self.history(host)
+        return history[-1] if history else None
+
+    def load(self, sha):
+        """Returns the stored (normalized) config text for a hash."""
+        with gzip.open(self._object_path(sha), "rt", encoding="utf-8") as f:
+            return f.read()
+
+    def entries_since(self, name, offset=0):
+        """
+        Reads the index entries of one host appended after byte `offset`.
+        name is a host's index name as returned by hosts(). Returns (entries, new_offset),
+        so a caller can keep the offset and later read only what was added since.
+        """
+        entries = []
+        with open(os.path.join(self.index_dir, f"{name}.jsonl"), "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break # Entry still being written, pick it up next time
+                offset += len(line)
+                if line.strip():
+                    entries.append(json.loads(line))
+        return entries, offset
+
+    def hosts(self):
+        """Returns the (file-safe) names of all hosts that have backups."""
+        return sorted(name[:-len(".jsonl")] for name in os.listdir(self.index_dir) if name.endswith(".jsonl"))
+
+
+# Shared store used by netmiko_operations
+default_store = None
+_default_store_lock = threading.Lock()
+
+def get_default_store():
+    """Returns the shared BackupStore, creating the backup directory on first use."""
+    global default_store
+    with _default_store_lock:
+        if default_store is None:
+            default_store = BackupStore()
+    return default_store
@@ -0,0 +1,96 @@
+# circuit_breaker.py
+import threading
+import time
+from contextlib import contextmanager
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of connecting while a host's circuit is open (it failed too often recently)."""
+
+
+class CircuitBreaker:
+    """
+    Remembers which hosts keep failing, per (host, protocol), so callers fail fast instead of
+    waiting for a full connect timeout every time.
+
+    After failure_threshold consecutive failures (timeouts, auth errors, ...) the circuit opens:
+    every call raises CircuitOpenError immediately for `cooldown` seconds. After the cool-down one
+    trial call is let through; if it succeeds the circuit closes, if it fails it opens again.
+
+        with breaker.guard((host, "ssh"), trip_on=(NetmikoTimeoutException,)):
+            net_connect = ConnectHandler(**device_info)
+
+    Errors not listed in trip_on (e.g. a bad command) mean the host answered, so they count as a success.
+    """
+
+    def __init__(self, failure_threshold=3, cooldown=30):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._failures = {}  # key -> consecutive failures
+        self._opened_at = {} # key -> time the circuit opened
+        self._trials = set() # keys with a trial call in progress (half-open)
+        self._lock = threading.Lock()
+
+    def state(self, key):
+        """"closed", "open" or "half-open"."""
+        with self._lock:
+            opened_at = self._opened_at.get(key)
+            if opened_at is None:
+                return "closed"
+            if key in self._trials or time.monotonic() - opened_at >= self.cooldown:
+                return "half-open"
+            return "open"
+
+    def before_call(self, key):
+        """Raises CircuitOpenError if the call must not be made now."""
+        with self._lock:
+            opened_at = self._opened_at.get(key)
+            if opened_at is None:
+                return
+            remaining = self.cooldown - (time.monotonic() - opened_at)
+            if remaining > 0:
+                raise CircuitOpenError(f"{key[0]} ({key[1]}) failed {self._failures[key]} times in a row, "
+                                       f"not retrying for another {remaining:.0f}s")
+            if key in self._trials:
+                raise CircuitOpenError(f"{key[0]} ({key[1]}) is being retried, waiting for the result")
+            self._trials.add(key)
+
+    def record_success(self, key):
+        with self._lock:
+            self._failures.pop(key, None)
+            self._opened_at.pop(key, None)
+            self._trials.discard(key)
+
+    def record_failure(self, key):
+        with self._lock:
+            self._failures[key] = self._failures.get(key, 0) + 1
+            if key in self._trials or self._failures[key] >= self.failure_threshold:
+                self._opened_at[key] = time.monotonic()
+            self._trials.discard(key)
+
+    @contextmanager
+    def guard(self, key, trip_on):
+        """Context manager around one call to the host: checks the circuit, then records the outcome."""
+        self.before_call(key)
+        try:
+            yield
+        except trip_on:
+            self.record_failure(key)
+            raise
+        except BaseException:
+            self.record_success(key)
+            raise
+        else:
+            self.record_success(key)
+
+    def reset(self, key=None):
+        """Closes one circuit (or all of them), e.g. after fixing a device's credentials."""
+        with self._lock:
+            if key is None:
+                self._failures.clear()
+                self._opened_at.clear()
+                self._trials.clear()
+            else:
+                self._failures.pop(key, None)
+                self._opened_at.pop(key, None)
+                self._trials.discard(key)
@@ -0,0 +1,143 @@
+# concurrency.py
+import statistics
+import threading
+import time
+from collections import deque
+
+CPU_SAMPLE_INTERVAL = 1.0 # Seconds between CPU usage measurements
+
+
+class CpuMeter:
+    """
+    CPU used by this process, from time.process_time() deltas over wall-clock time (works on Windows too).
+    1.0 means one core fully busy; with the GIL, Python-side work (SSH crypto, parsing, our own
+    bookkeeping) tops out around there, so that's where adding sessions stops helping.
+    """
+
+    def __init__(self, interval=CPU_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._last_cpu = time.process_time()
+        self._last_wall = time.monotonic()
+        self._usage = 0.0
+
+    def usage(self):
+        """CPU seconds per wall second over the last completed interval."""
+        now = time.monotonic()
+        elapsed = now - self._last_wall
+        if elapsed >= self.interval:
+            cpu = time.process_time()
+            self._usage = (cpu - self._last_cpu) / elapsed
+            self._last_cpu = cpu
+            self._last_wall = now
+        return self._usage
+
+
+class AdaptiveConcurrency:
+    """
+    Decides how many device sessions may run at the same time, like TCP congestion control (AIMD).
+
+    Every finished device job is reported with record(latency, failed):
+      - additive increase: while jobs are fast and succeed, the limit grows by about `increase`
+        per `limit` finished jobs (one "round" of the fleet)
+      - multiplicative decrease: if the error rate of the last `window` jobs goes above error_threshold,
+        the median latency of the last `window` jobs goes above latency_tolerance x the long-run median
+        (the last window * 10 jobs), or this process's CPU use goes above cpu_threshold (see CpuMeter),
+        the limit is multiplied by decrease_factor
+    After a decrease the controller waits for one round of results before deciding again,
+    so the jobs that were already running with the old limit don't cut it twice.
+
+    So a job speeds up on a fast LAN and backs off when the TACACS server or a WAN link starts timing out.
+
+        controller = AdaptiveConcurrency(initial=10, max_limit=200)
+        for result in run_fleet(devices, process_device_concurrently, concurrency=controller): ...
+
+    With any other executor, wrap the operation: executor.map(controller.track(operation), devices)
+    (the executor needs at least max_limit threads; track() makes the extra ones wait).
+    """
+
+    def __init__(self, initial=10, min_limit=1, max_limit=200, increase=1, decrease_factor=0.5,
+                 window=20, error_threshold=0.2, latency_tolerance=2.0, cpu_threshold=0.9):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.error_threshold = error_threshold
+        self.latency_tolerance = latency_tolerance
+        self.cpu_threshold = cpu_threshold
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self._samples = deque(maxlen=window)       # (latency, failed) of the last finished jobs
+        self._baseline = deque(maxlen=window * 10) # Successful latencies over a longer period
+        self._cpu = CpuMeter()
+        self._hold = 0 # Results to skip deciding on after a decrease
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self):
+        """Current number of jobs allowed to run at the same time."""
+        return int(self._limit)
+
+    def _overloaded(self):
+        failures = sum(1 for _, failed in self._samples if failed)
+        if failures / len(self._samples) > self.error_threshold:
+            return "error rate"
+        # Medians, so a few slow devices (or the normal spread between devices) don't count as overload
+        latencies = [latency for latency, failed in self._samples if not failed]
+        if latencies and self._baseline:
+            baseline = statistics.median(self._baseline)
+            if baseline > 0 and statistics.median(latencies) > baseline * self.latency_tolerance:
+                return "latency"
+        if self._cpu.usage() > self.cpu_threshold:
+            return "cpu"
+        return None
+
+    def record(self, latency, failed):
+        """Reports one finished job (latency in seconds) and adjusts the limit."""
+        with self._cond:
+            self._samples.append((latency, failed))
+            if not failed:
+                self._baseline.append(latency)
+            if self._hold > 0:
+                self._hold -= 1
+            elif len(self._samples) >= min(self._samples.maxlen, self.limit):
+                reason = self._overloaded()
+                if reason:
+                    self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+                    self._hold = self.limit
+                    self._samples.clear()
+                elif not failed:
+                    self._limit = min(self.max_limit, self._limit + self.increase / self._limit)
+            self._cond.notify_all()
+
+    def acquire(self):
+        """Blocks until fewer than `limit` jobs are running, then counts one more."""
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self, latency, failed):
+        """Counts a job as finished and records its outcome."""
+        with self._cond:
+            self._in_flight -= 1
+        self.record(latency, failed)
+
+    def track(self, operation, is_failure=None):
+        """
+        Wraps operation(device_info) so each call waits for a free slot and reports its outcome.
+        is_failure(output) decides if a returned value counts as a failure (exceptions always do);
+        by default a returned DeviceResult counts with its own status.
+        """
+        if is_failure is None:
+            is_failure = lambda output: getattr(output, "failed", False)
+        def tracked(device_info):
+            self.acquire()
+            started_at = time.monotonic()
+            failed = True
+            try:
+                output = operation(device_info)
+                failed = bool(is_failure(output))
+                return output
+            finally:
+                self.release(time.monotonic() - started_at, failed)
+        return tracked
@@ -0,0 +1,136 @@
+# config_search.py
+import gzip
+import json
+import os
+import re
+import threading
+from backup_store import get_default_store
+
+SEARCH_INDEX_FILE = "search_index.json.gz" # Saved next to the backups (in the store's root directory)
+
+
+def normalize_line(line):
+    """Config line as it is indexed: no leading/trailing spaces, single spaces between words."""
+    return " ".join(line.split())
+
+
+class ConfigSearchIndex:
+    """
+    Inverted index over the backup store: normalized config line -> configs (by hash) containing it.
+
+    Identical configs are stored once in the backup store, so they are also indexed once.
+    For every host the index remembers its backup history (timestamp, hash), so a query can be
+    answered for the newest backup of each device or for every backup version.
+
+    update() only reads index entries and configs added since the last update, and the index
+    can be saved to / loaded from disk so a restart doesn't re-read every backup:
+
+        index = ConfigSearchIndex.load()
+        index.update()
+        index.hosts_with_line("ip http server")
+        index.save()
+    """
+
+    def __init__(self, store=None):
+        self.store = store or get_default_store()
+        self._postings = {}    # normalized line -> set of config hashes
+        self._indexed = set()  # config hashes already indexed
+        self._history = {}     # host -> [(timestamp, hash), ...] oldest first
+        self._latest = {}      # config hash -> set of hosts whose newest backup it is
+        self._offsets = {}     # host index name -> bytes of its index file already read
+        self._lock = threading.Lock()
+
+    def _index_config(self, sha):
+        for line in self.store.load(sha).splitlines():
+            line = normalize_line(line)
+            if line and not line.startswith("!"):
+                self._postings.setdefault(line, set()).add(sha)
+        self._indexed.add(sha)
+
+    def update(self):
+        """Indexes backups added to the store since the last update. Returns the number of new backup entries."""
+        added = 0
+        with self._lock:
+            for name in self.store.hosts():
+                entries, self._offsets[name] = self.store.entries_since(name, self._offsets.get(name, 0))
+                for entry in entries:
+                    if entry["sha256"] not in self._indexed:
+                        self._index_config(entry["sha256"])
+                    self._add_version(entry["host"], entry["timestamp"], entry["sha256"])
+                    added += 1
+        return added
+
+    def _add_version(self, host, timestamp, sha):
+        history = self._history.setdefault(host, [])
+        if history:
+            self._latest[history[-1][1]].discard(host)
+        history.append((timestamp, sha))
+        self._latest.setdefault(sha, set()).add(host)
+
+    def _hosts_for_shas(self, shas, latest_only):
+        if latest_only:
+            return sorted(set().union(*(self._latest.get(sha, ()) for sha in shas)))
+        return sorted(host for host, history in self._history.items() if any(sha in shas for _, sha in history))
+
+    def hosts_with_line(self, line, latest_only=True):
+        """
+        Hosts whose config contains this exact line (whitespace is normalized), e.g. "ip http server".
+        latest_only=True only looks at each host's newest backup.
+        """
+        with self._lock:
+            shas = self._postings.get(normalize_line(line), set())
+            return self._hosts_for_shas(shas, latest_only) if shas else []
+
+    def versions_with_line(self, line):
+        """Every (host, timestamp, hash) backup version whose config contains this exact line."""
+        with self._lock:
+            shas = self._postings.get(normalize_line(line), set())
+            return [(host, timestamp, sha)
+                    for host, history in self._history.items()
+                    for timestamp, sha in history if sha in shas]
+
+    def search(self, pattern, latest_only=True):
+        """
+        Regex search over the distinct indexed lines (much fewer than the lines of all backups).
+        Returns {matching line: [hosts]} for lines found on at least one host.
+        """
+        regex = re.compile(pattern)
+        results = {}
+        with self._lock:
+            for line, shas in self._postings.items():
+                if regex.search(line):
+                    hosts = self._hosts_for_shas(shas, latest_only)
+                    if hosts:
+                        results[line] = hosts
+        return results
+
+    def save(self, path=None):
+        """Writes the index to disk (gzip-compressed JSON)."""
+        path = path or os.path.join(self.store.root, SEARCH_INDEX_FILE)
+        with self._lock:
+            data = {
+                "postings": {line: sorted(shas) for line, shas in self._postings.items()},
+                "indexed": sorted(self._indexed),
+                "history": self._history,
+                "offsets": self._offsets,
+            }
+            tmp_path = f"{path}.tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, store=None, path=None):
+        """Loads a saved index (or returns an empty one if none was saved yet). Call update() afterwards."""
+        index = cls(store)
+        path = path or os.path.join(index.store.root, SEARCH_INDEX_FILE)
+        if os.path.exists(path):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            index._postings = {line: set(shas) for line, shas in data["postings"].items()}
+            index._indexed = set(data["indexed"])
+            for host, history in data["history"].items():
+                for timestamp, sha in history:
+                    index._add_version(host, timestamp, sha)
+            index._offsets = data["offsets"]
+        return index
@@ -0,0 +1,303 @@
+# config_tree.py
+import re
+from backup_store import get_default_store
+
+
+class ConfigLine:
+    """One line of configuration with its parent and indented child lines."""
+
+    __slots__ = ("text", "indent", "parent", "children")
+
+    def __init__(self, text, indent, parent=None):
+        self.text = text
+        self.indent = indent
+        self.parent = parent
+        self.children = []
+
+    def __repr__(self):
+        return f"ConfigLine({self.text!r})"
+
+    @property
+    def keyword(self):
+        """First word of the line, e.g. "interface" or "router"."""
+        return self.text.split(None, 1)[0]
+
+    def path(self):
+        """List of line texts from the top-level parent down to this line."""
+        path = []
+        line = self
+        while line is not None:
+            path.append(line.text)
+            line = line.parent
+        return path[::-1]
+
+    def children_matching(self, pattern):
+        """Direct children whose text matches the regex (re.match, i.e. anchored at the start)."""
+        regex = re.compile(pattern)
+        return [child for child in self.children if regex.match(child.text)]
+
+    def walk(self):
+        """Yields this line and every line below it, depth first."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+class ConfigTree:
+    """
+    Parent/child tree of an IOS / IOS XE / IOS XR configuration, built once from text.
+
+    Top-level sections are indexed by their first keyword (interface, router, crypto, ...)
+    and their child lines by (section keyword, child keyword), so questions like
+    "which interfaces have ip ospf" only look at the lines that can match:
+
+        tree = ConfigTree.from_backup("10.10.20.48")
+        tree.sections_with_child("interface", r"ip ospf")
+        tree.section("router ospf 1").children_matching(r"network ")
+    """
+
+    def __init__(self, config_text):
+        self.roots = []
+        self._by_text = {}     # top-level line text -> ConfigLine
+        self._by_keyword = {}  # top-level keyword -> [ConfigLine]
+        self._child_index = {} # (top-level keyword, child keyword) -> [child ConfigLine]
+        self._parse(config_text)
+
+    @classmethod
+    def from_backup(cls, host, store=None):
+        """Builds the tree from the newest stored backup of a host (see backup_store)."""
+        store = store or get_default_store()
+        latest = store.latest(host)
+        if latest is None:
+            raise LookupError(f"No backup stored for {host}")
+        return cls(store.load(latest["sha256"]))
+
+    def _parse(self, config_text):
+        stack = [] # Open parents, innermost last
+        banner_end = None
+        for raw_line in config_text.splitlines():
+            line = raw_line.rstrip()
+            if banner_end is not None:
+                # Banner text is kept as-is under its banner line
+                stack[-1].children.append(ConfigLine(line, len(line) - len(line.lstrip()), stack[-1]))
+                if banner_end in line:
+                    banner_end = None
+                    stack.pop()
+                continue
+            stripped = line.lstrip()
+            # Skip blank lines, "!" separators/comments and the closing "end"
+            if not stripped or stripped.startswith("!") or line == "end":
+                continue
+            indent = len(line) - len(stripped)
+            while stack and stack[-1].indent >= indent:
+                stack.pop()
+            parent = stack[-1] if stack else None
+            node = ConfigLine(stripped, indent, parent)
+            if parent is None:
+                self.roots.append(node)
+                self._by_text[stripped] = node
+                self._by_keyword.setdefault(node.keyword, []).append(node)
+            else:
+                parent.children.append(node)
+                self._child_index.setdefault((stack[0].keyword, node.keyword), []).append(node)
+            stack.append(node)
+
+            banner = re.match(r"banner \S+ (\^C|\S)", stripped)
+            if banner and stripped.count(banner.group(1)) < 2:
+                # Multi-line banner: everything up to the closing delimiter belongs to it
+                banner_end = banner.group(1)
+
+    def section(self, text):
+        """Returns the top-level line with exactly this text (e.g. "router ospf 1"), or None."""
+        return self._by_text.get(text)
+
+    def sections(self, keyword, pattern=None):
+        """
+        Top-level lines starting with keyword (e.g. "interface").
+        pattern optionally filters on the full text with re.match (e.g. r"interface Loopback").
+        """
+        lines = self._by_keyword.get(keyword, [])
+        if pattern is None:
+            return list(lines)
+        regex = re.compile(pattern)
+        return [line for line in lines if regex.match(line.text)]
+
+    def find_children(self, keyword, child_pattern):
+        """
+        All lines under `keyword` sections (at any depth) whose text matches child_pattern (re.match).
+        When the pattern starts with a plain word (e.g. r"ip ospf"), only child lines starting
+        with that word are looked at; other patterns, including ones with a top-level alternation
+        (e.g. r"description uplink|ip ospf"), scan every line of those sections.
+        """
+        regex = re.compile(child_pattern)
+        first_word = re.match(r"[\w-]+(?= |$)", child_pattern)
+        if first_word and not _has_top_level_alternation(child_pattern):
+            candidates = self._child_index.get((keyword, first_word.group()), [])
+        else:
+            candidates = (line for section in self._by_keyword.get(keyword, []) for line in section.walk() if line is not section)
+        return [line for line in candidates if regex.match(line.text)]
+
+    def sections_with_child(self, keyword, child_pattern):
+        """Top-level `keyword` sections having at least one line matching child_pattern."""
+        sections = []
+        for line in self.find_children(keyword, child_pattern):
+            top = line
+            while top.parent is not None:
+                top = top.parent
+            if not sections or sections[-1] is not top:
+                sections.append(top)
+        return sections
+
+    def __iter__(self):
+        """Yields every line of the configuration in order."""
+        for root in self.roots:
+            yield from root.walk()
+
+
+def _has_top_level_alternation(pattern):
+    """True if the regex has a | outside any group or character class (so it may not start with its first word)."""
+    depth = 0
+    in_class = False
+    escaped = False
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+    return False
+
+
+# Top-level commands that open a configuration sub-mode. In a flat command list (like the ones
+# passed to send_config_set) the lines after one of these belong to it until the next one.
+# Prefixes are used because e.g. "ip access-list extended X" opens a sub-mode but "ip route ..." does not.
+SECTION_PREFIXES = (
+    "interface ", "router ", "line ", "vlan ", "vrf definition ", "route-map ", "policy-map ",
+    "class-map ", "controller ", "track ", "object-group ", "key chain ", "ip access-list ",
+    "ipv6 access-list ", "ip vrf ", "ip sla ", "aaa group ", "crypto isakmp policy ",
+    "crypto ipsec profile ", "crypto pki trustpoint ", "crypto map ", "redundancy",
+    "control-plane", "archive",
+)
+
+
+# Commands that only exist in global configuration. In a flat list one of these after a section line
+# goes back to global config (IOS leaves the sub-mode by itself) instead of becoming a child of the section.
+GLOBAL_COMMAND_PREFIXES = (
+    "hostname ", "ip domain", "ip name-server ", "ip route ", "ipv6 route ", "ip routing", "ipv6 unicast-routing",
+    "ip ssh ", "ip http ", "ip scp ", "ip source-route", "ip forward-protocol ", "cdp run", "lldp run",
+    "username ", "enable ", "service ", "banner ", "snmp-server ", "ntp server ", "ntp source ", "logging host ",
+    "logging buffered", "logging console", "clock timezone ", "boot ", "aaa ", "spanning-tree mode ",
+    "netconf-yang", "restconf", "license ",
+)
+
+# Negations whose positive form is simply not shown when it is negated (a running interface has
+# no "shutdown" line and no "no shutdown" line either). Every other "no X" is sent unless "no X" is shown.
+NEGATED_WHEN_ABSENT = ("shutdown",)
+
+
+def _opens_section(command):
+    return command.startswith(SECTION_PREFIXES)
+
+
+def _is_global_command(command):
+    if command.startswith("no "):
+        command = command[3:]
+    return command.startswith(GLOBAL_COMMAND_PREFIXES)
+
+
+def group_commands(config_commands):
+    """
+    Turns a list of config commands into a tree: [(line, [child nodes])], each child node being (line, [...]) too.
+
+    Indented commands are nested by indentation, like the running-config
+    ("policy-map PM", " class C1", "  police 8000"). In a flat list (like the ones usually passed
+    to send_config_set) the unindented commands after a section line (one starting with
+    SECTION_PREFIXES: interface, router ospf, ...) are its children until the next section, an "exit"
+    or a global-only command (GLOBAL_COMMAND_PREFIXES: hostname, ip route, ...).
+    "exit" closes the sections opened at its indentation or deeper.
+    """
+    roots = []
+    stack = [] # Open (indent, node), innermost last
+    for command in config_commands:
+        text = " ".join(command.split())
+        if not text:
+            continue
+        indent = len(command) - len(command.lstrip())
+        if text == "exit":
+            # Leaves the sub-mode(s) opened at this indentation or deeper ("exit" at the left margin: back to global)
+            while stack and stack[-1][0] >= indent:
+                stack.pop()
+            continue
+        if indent == 0:
+            if stack and not _opens_section(text) and not _is_global_command(text) and _opens_section(stack[0][1][0]):
+                indent = 1 # Flat list: belongs to the open section
+            else:
+                stack = []
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        node = (text, [])
+        (stack[-1][1][1] if stack else roots).append(node)
+        stack.append((indent, node))
+    return roots
+
+
+def _line_present(text, lines):
+    """
+    True if a config line is already in effect given the existing lines at the same level.
+    "no X" counts as present when "no X" is shown, or for the NEGATED_WHEN_ABSENT commands
+    ("no shutdown" never appears in a running-config) when no line starts with X.
+    Other negations are always sent: "no ip address" or "no cdp run" remove something that
+    isn't shown as the bare text X (a parameterised line, or a default that is on).
+    """
+    if text in lines:
+        return True
+    if text.startswith("no ") and text[3:] in NEGATED_WHEN_ABSENT:
+        positive = text[3:]
+        return not any(line == positive or line.startswith(positive + " ") for line in lines)
+    return False
+
+
+def _flatten(nodes, depth):
+    for text, children in nodes:
+        yield " " * depth + text
+        yield from _flatten(children, depth + 1)
+
+
+def _missing(nodes, existing_lines, depth):
+    by_text = {" ".join(line.text.split()): line for line in existing_lines}
+    missing = []
+    for text, children in nodes:
+        existing = by_text.get(text)
+        if existing is None:
+            if children:
+                # New section: send all of it, defaults of a section that doesn't exist yet can't be assumed
+                missing.extend(_flatten([(text, children)], depth))
+            elif not _line_present(text, by_text):
+                missing.append(" " * depth + text)
+            continue
+        missing_children = _missing(children, existing.children, depth + 1)
+        if missing_children:
+            # The section line puts the device in the right (sub-)mode for its children
+            missing.append(" " * depth + text)
+            missing.extend(missing_children)
+    return missing
+
+
+def missing_commands(tree, config_commands):
+    """
+    Returns the subset of config_commands that is not already in the configuration tree.
+    Every level is compared with the matching lines of the tree (e.g. "police 8000" with the lines
+    under "policy-map PM" / "class C1"), and every parent line is kept in front of its missing
+    children so the list can be sent as-is with send_config_set(). Lines are indented one space
+    per level. Returns [] when the device is already compliant.
+    """
+    return _missing(group_commands(config_commands), tree.roots, 0)
@@ -0,0 +1,208 @@
+# connection_pool.py
+from netmiko import ConnectHandler
+from netmiko.exceptions import NetmikoTimeoutException
+import atexit
+import socket
+import threading
+import time
+from latency import phase_metrics
+
+# Default pool settings. A session that has been idle longer than IDLE_TIMEOUT seconds
+# is closed instead of reused (most devices drop idle VTY sessions after a while anyway).
+DEFAULT_IDLE_TIMEOUT = 300
+DEFAULT_MAX_SESSIONS_PER_DEVICE = 2
+DEFAULT_CHECKOUT_TIMEOUT = 60
+
+
+def _timed_method(net_connect, name, phase, host, platform):
+    """Replaces a method on this one connection object with a version that records its duration."""
+    method = getattr(net_connect, name)
+    def timed(*args, **kwargs):
+        with phase_metrics.timer(phase, host, platform):
+            return method(*args, **kwargs)
+    setattr(net_connect, name, timed)
+
+
+def connect_with_phases(device_info):
+    """
+    Same as ConnectHandler(**device_info), but records how long each phase of the login takes
+    (see latency.phase_metrics):
+      tcp_connect       - TCP handshake (we open the socket ourselves and hand it to Netmiko with sock=)
+      ssh_connect       - SSH key exchange and authentication
+      prompt_discovery  - set_base_prompt() during session preparation
+      disable_paging    - disable_paging() during session preparation
+      session_preparation - all of session preparation (includes the two above and terminal width)
+    Devices reached through an SSH proxy/jump host (ssh_config_file or sock in device_info) and
+    telnet/serial device types are connected the normal way and only the whole login is recorded, as "connect".
+    """
+    host = device_info.get("host", "")
+    platform = device_info.get("device_type", "")
+    if "sock" in device_info or device_info.get("ssh_config_file") or platform.endswith(("_telnet", "_serial")):
+        with phase_metrics.timer("connect", host, platform):
+            return ConnectHandler(**device_info)
+
+    port = device_info.get("port", 22)
+    with phase_metrics.timer("tcp_connect", host, platform):
+        try:
+            sock = socket.create_connection((host, port), timeout=device_info.get("conn_timeout", 10))
+        except OSError as e:
+            # Netmiko reports a failed TCP connect as NetmikoTimeoutException; keep that for callers
+            # (the error messages in netmiko_operations and the SSH circuit breaker rely on it)
+            raise NetmikoTimeoutException(f"TCP connection to device failed.\n\nDevice settings: {platform} {host}:{port}\n\n{e}") from e
+    try:
+        net_connect = ConnectHandler(**device_info, sock=sock, auto_connect=False)
+        # Same steps as Netmiko's own BaseConnection._open(), timed one by one
+        net_connect._modify_connection_params()
+        with phase_metrics.timer("ssh_connect", host, platform):
+            net_connect.establish_connection()
+        _timed_method(net_connect, "set_base_prompt", "prompt_discovery", host, platform)
+        _timed_method(net_connect, "disable_paging", "disable_paging", host, platform)
+        try:
+            with phase_metrics.timer("session_preparation", host, platform):
+                net_connect._try_session_preparation()
+        finally:
+            # Back to the class methods, later calls (e.g. after a reconnect) aren't login phases
+            del net_connect.set_base_prompt
+            del net_connect.disable_paging
+        return net_connect
+    except Exception:
+        sock.close()
+        raise
+
+
+def pool_key(device_info):
+    """
+    Returns the key used to group sessions in the pool.
+    Two device dictionaries with the same host, port, username and device_type share sessions.
+    """
+    return (
+        device_info.get("host"),
+        device_info.get("port", 22),
+        device_info.get("username"),
+        device_info.get("device_type"),
+    )
+
+
+class ConnectionPool:
+    """
+    Keeps authenticated Netmiko sessions open per device so they can be reused.
+
+    checkout() hands out an idle session (or opens a new one if the device is below
+    max_sessions_per_device), checkin() gives it back. Sessions are health-checked with
+    is_alive() before reuse and closed once they have been idle longer than idle_timeout.
+    """
+
+    def __init__(self, idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 max_sessions_per_device=DEFAULT_MAX_SESSIONS_PER_DEVICE,
+                 checkout_timeout=DEFAULT_CHECKOUT_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self.max_sessions_per_device = max_sessions_per_device
+        self.checkout_timeout = checkout_timeout
+        self._idle = {}      # key -> list of (connection, time it was checked in)
+        self._in_use = {}    # key -> number of sessions currently checked out
+        self._condition = threading.Condition()
+
+    def _open_count(self, key):
+        return len(self._idle.get(key, [])) + self._in_use.get(key, 0)
+
+    def checkout(self, device_info):
+        """
+        Returns a connected Netmiko session for the device.
+        Blocks while the device already has max_sessions_per_device sessions checked out.
+        """
+        key = pool_key(device_info)
+        deadline = time.time() + self.checkout_timeout
+        while True:
+            with self._condition:
+                while not self._idle.get(key) and self._open_count(key) >= self.max_sessions_per_device:
+                    # Wait for another thread to check a session back in
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No free session for {key[0]} after {self.checkout_timeout}s "
+                                           f"(max {self.max_sessions_per_device} per device)")
+                    self._condition.wait(remaining)
+                idle = self._idle.get(key)
+                candidate = idle.pop() if idle else None
+                self._in_use[key] = self._in_use.get(key, 0) + 1
+
+            if candidate is None:
+                # Connect outside the lock so slow devices don't block the whole pool
+                try:
+                    return connect_with_phases(device_info)
+                except Exception:
+                    self._release_slot(key)
+                    raise
+
+            # Reuse an idle session only if it is fresh and still alive
+            net_connect, checked_in_at = candidate
+            try:
+                healthy = (time.time() - checked_in_at) < self.idle_timeout and net_connect.is_alive()
+            except Exception:
+                healthy = False
+            if healthy:
+                return net_connect
+            self._release_slot(key)
+            self._close(net_connect)
+
+    def _release_slot(self, key):
+        with self._condition:
+            self._in_use[key] = max(self._in_use.get(key, 0) - 1, 0)
+            self._condition.notify()
+
+    def checkin(self, device_info, net_connect, discard=False):
+        """
+        Returns a session to the pool. Use discard=True when the session is in an
+        unknown state (e.g. an exception happened mid-command) so it gets closed instead.
+        """
+        key = pool_key(device_info)
+        with self._condition:
+            self._in_use[key] = max(self._in_use.get(key, 0) - 1, 0)
+            if not discard:
+                self._idle.setdefault(key, []).append((net_connect, time.time()))
+            self._condition.notify()
+        if discard:
+            self._close(net_connect)
+
+    def close_idle(self):
+        """Closes sessions that have been idle longer than idle_timeout."""
+        now = time.time()
+        expired = []
+        with self._condition:
+            for key, idle in self._idle.items():
+                keep = []
+                for net_connect, checked_in_at in idle:
+                    if now - checked_in_at >= self.idle_timeout:
+                        expired.append(net_connect)
+                    else:
+                        keep.append((net_connect, checked_in_at))
+                self._idle[key] = keep
+        for net_connect in expired:
+            self._close(net_connect)
+
+    def close_device(self, device_info):
+        """Closes the idle sessions of one device (e.g. once a fleet job is done with it)."""
+        with self._condition:
+            idle = self._idle.pop(pool_key(device_info), [])
+        for net_connect, _ in idle:
+            self._close(net_connect)
+
+    def close_all(self):
+        """Closes every idle session. Sessions still checked out are closed when checked in with discard=True."""
+        with self._condition:
+            idle_sessions = [net_connect for idle in self._idle.values() for net_connect, _ in idle]
+            self._idle.clear()
+        for net_connect in idle_sessions:
+            self._close(net_connect)
+
+    @staticmethod
+    def _close(net_connect):
+        try:
+            with phase_metrics.timer("teardown", getattr(net_connect, "host", ""), getattr(net_connect, "device_type", "")):
+                net_connect.disconnect()
+        except Exception:
+            pass # The session is going away anyway
+
+
+# Shared pool used by netmiko_operations. Idle sessions are closed when the script exits.
+default_pool = ConnectionPool()
+atexit.register(default_pool.close_all)
@@ -0,0 +1,107 @@
+# fleet_runner.py
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import time
+from connection_pool import default_pool
+from reachability import split_by_reachability
+from results import as_result, failed_result, aggregate_results
+
+DEFAULT_MAX_WORKERS = 50
+
+
+def _run_one(operation, device_info, submitted_at, close_sessions):
+    """Runs the operation for one device and records how long it waited and how long it ran."""
+    started_at = time.time()
+    host = device_info.get("host", "Unknown Host")
+    name = getattr(operation, "__name__", str(operation))
+    try:
+        result = as_result(operation(device_info), host, "ssh", name)
+    except Exception as e:
+        result = failed_result(host, "ssh", name, f"{type(e).__name__}: {e}", e)
+    finally:
+        if close_sessions:
+            # A fleet job touches each device once, so don't keep thousands of idle SSH sessions around
+            default_pool.close_device(device_info)
+    result.queue_time = started_at - submitted_at
+    result.wall_time = time.time() - started_at
+    return result
+
+
+def unreachable_result(device_info, operation):
+    """Result for a device skipped by the reachability pre-check."""
+    return failed_result(device_info.get("host", "Unknown Host"), "ssh", getattr(operation, "__name__", str(operation)),
+                         "Unreachable: SSH port did not answer the TCP pre-check")
+
+
+def run_fleet(devices, operation, max_workers=DEFAULT_MAX_WORKERS, close_sessions=True, precheck=None,
+              concurrency=None, stop=None):
+    """
+    Runs operation(device_info) for every device in the inventory on a bounded thread pool.
+
+    This is a generator: results are yielded as soon as each host finishes (not in inventory order),
+    so the caller can print or save them while the rest of the fleet is still running.
+    At most 2 * max_workers devices are queued at a time, so huge inventories can be streamed in.
+    If the caller stops iterating early, queued devices that haven't started are cancelled.
+    To stop without losing results, set `stop` (a threading.Event) instead: no new devices are started,
+    queued ones are cancelled, and the devices already running are still waited for and yielded.
+
+    Each result is a DeviceResult (see results.py). Operations that return something else (e.g. a
+    string) get it wrapped as the result's output.
+
+    precheck probes the SSH port of the whole inventory first (see reachability.py), so dead devices
+    don't hold a worker until their SSH timeout. It reads the whole inventory up front.
+      precheck="skip": unreachable devices are not run, they are yielded first as failed results
+      precheck="last": unreachable devices are still tried, after all reachable ones
+
+    concurrency: an AdaptiveConcurrency controller (see concurrency.py) instead of a fixed max_workers.
+    The number of devices running at once then follows controller.limit, which is adjusted from
+    each result's wall time and failure; max_workers is ignored.
+    """
+    if precheck is not None:
+        reachable, unreachable, _ = split_by_reachability(devices)
+        if precheck == "skip":
+            for device_info in unreachable:
+                yield unreachable_result(device_info, operation)
+            devices = reachable
+        elif precheck == "last":
+            devices = reachable + unreachable
+        else:
+            raise ValueError(f"Unknown precheck mode: {precheck!r} (use 'skip' or 'last')")
+
+    device_iter = iter(devices)
+    if concurrency is not None:
+        max_workers = concurrency.max_limit
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+        try:
+            while True:
+                # Top up the queue. With a controller only `limit` devices are submitted, so none wait in the queue.
+                max_pending = concurrency.limit if concurrency is not None else max_workers * 2
+                if stop is not None and stop.is_set():
+                    # Drop the devices that haven't started; keep waiting for the running ones
+                    pending = {future for future in pending if not future.cancel()}
+                    max_pending = 0
+                while len(pending) < max_pending:
+                    device_info = next(device_iter, None)
+                    if device_info is None:
+                        break
+                    pending.add(executor.submit(_run_one, operation, device_info, time.time(), close_sessions))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if concurrency is not None:
+                        concurrency.record(result.wall_time, result.failed)
+                    yield result
+        finally:
+            # The caller stopped early (e.g. a rollout wave failed): drop devices that haven't started yet
+            for future in pending:
+                future.cancel()
+
+
+def summarize_fleet_results(results):
+    """
+    Builds a summary dict (totals, failed hosts, error types, timing stats) from the results of run_fleet.
+    See results.aggregate_results.
+    """
+    return aggregate_results(results)
@@ -0,0 +1,76 @@
+# lab_multi_device.py
+import time
+from devices import multi_devices # Import the list of lab devices
+from netmiko_operations import process_device_concurrently # Work done on each device
+from fleet_runner import run_fleet, summarize_fleet_results, unreachable_result # Bounded thread pool runner
+from rollout import run_rollout # Canary + growing waves for config changes
+from reachability import split_by_reachability # Fast TCP pre-check of the inventory
+from result_sink import JsonlResultSink, read_results # Results streamed to a JSON Lines file
+from latency import phase_metrics # Time spent per phase (TCP/SSH connect, prompt, commands, ...)
+
+print("--- Lab 3: Process Multiple Devices Concurrently ---")
+
+# The runner keeps at most MAX_WORKERS SSH sessions busy at the same time.
+# Raise it for big inventories (e.g. 100+ for a 5,000 router backup), keep it low for a small lab.
+MAX_WORKERS = 10
+
+# process_device_concurrently pushes config, so roll it out in waves: one canary device first,
+# then 2, 4, 8, ... devices. A wave below SUCCESS_THRESHOLD stops the rollout.
+USE_ROLLOUT = True
+SUCCESS_THRESHOLD = 0.9
+
+# Probe the SSH port of all devices at once and leave out the ones that don't answer, so a powered-off
+# router doesn't hold a worker until its SSH timeout (or fail a rollout wave). They are still
+# recorded as failed results in the results file and the summary.
+PRECHECK = True
+
+# Every result is appended to this file as it completes, so big runs don't keep all outputs in memory
+RESULTS_FILE = f"fleet_results_{time.strftime('%Y%m%d_%H%M%S')}.jsonl"
+# Per-phase latency histograms of this run; the module 5 dashboard can serve them on /metrics
+LATENCY_FILE = "latency_metrics.json"
+
+start_time = time.time()
+sink = JsonlResultSink(RESULTS_FILE)
+devices = multi_devices
+
+def print_result(result):
+    status = "FAILED" if result.failed else "OK"
+    print(f"\n[{result.host}] {status} (queued {result.queue_time:.2f}s, ran {result.wall_time:.2f}s)")
+    print(result)
+    sink.write(result)
+
+if PRECHECK:
+    devices, unreachable, _ = split_by_reachability(multi_devices)
+    for device_info in unreachable:
+        print_result(unreachable_result(device_info, process_device_concurrently))
+
+# Results are printed as soon as each device finishes, not in inventory order
+if USE_ROLLOUT:
+    report = run_rollout(devices, process_device_concurrently, max_workers=MAX_WORKERS,
+                         success_threshold=SUCCESS_THRESHOLD, on_result=print_result)
+    if report["halted"]:
+        print(f"\nRollout halted, no result for: {', '.join(report['no_result']) or 'none'}")
+else:
+    for result in run_fleet(devices, process_device_concurrently, max_workers=MAX_WORKERS):
+        print_result(result)
+sink.close()
+
+# Summary streamed back from the results file
+summary = summarize_fleet_results(read_results(RESULTS_FILE))
+print("\n--- Fleet Summary ---")
+print(f"Devices: {summary['total']}, succeeded: {summary['succeeded']}, failed: {summary['failed']}")
+print(f"Wall time per device: avg {summary['avg_wall_time']:.2f}s, max {summary['max_wall_time']:.2f}s")
+print(f"Queue time per device: avg {summary['avg_queue_time']:.2f}s, max {summary['max_queue_time']:.2f}s")
+print(f"Wall time p50 {summary['p50_wall_time']:.2f}s, p95 {summary['p95_wall_time']:.2f}s")
+if summary["error_types"]:
+    print(f"Failures by error type: {summary['error_types']}")
+if summary["failed_hosts"]:
+    print(f"Failed devices: {', '.join(summary['failed_hosts'])}")
+print("\n--- Where the time went (p50 / p99 per phase) ---")
+for entry in phase_metrics.to_json():
+    print(f"{entry['host']:<16} {entry['phase']:<20} {entry['command'][:30]:<30} "
+          f"p50 {entry['p50']:.3f}s  p99 {entry['p99']:.3f}s  (n={entry['count']})")
+phase_metrics.save_json(LATENCY_FILE)
+print(f"Results saved to {RESULTS_FILE}, latency histograms to {LATENCY_FILE}")
+print(f"Total time: {time.time() - start_time:.2f} seconds")
+print("\nLab 3 complete.")
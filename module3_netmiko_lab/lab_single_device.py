@@ -1,6 +1,6 @@
 # lab_single_device.py
 from devices import single_device # Import the single device dictionary
-from netmiko_operations import get_device_info, apply_config_commands, backup_running_config # Import the function to get device info
+from netmiko_operations import get_device_info, apply_config_commands, backup_running_config, run_show_commands # Import the function to get device info
 
 print("--- Lab 1.2: Connect to a Single Device ---")
 
@@ -23,15 +23,23 @@ config_commands = [
 ]
 
 print("\nApplying configuration commands...")
-config_output = apply_config_commands(single_device, config_commands)
+# only_missing=True compares with the running-config first and sends only what is missing,
+# so re-running the lab doesn't push the same Loopback100/OSPF lines again
+config_output = apply_config_commands(single_device, config_commands, only_missing=True)
 print("\n--- Configuration Output ---")
 print(config_output)
 commands = ["show run interface loo100", "show run | sec ospf"]
 print("\n--- Result after change config ---")
-for cmd in commands:
-    output = get_device_info(single_device, cmd)
-    print(output)
-    print("="*60 + "\n")
+# All commands run over one SSH session; pipeline=True sends the next command as soon as
+# the prompt for the previous one comes back.
+result = run_show_commands(single_device, commands, pipeline=True)
+if not result.failed:
+    for cmd, output in result.output.items():
+        print(f"# {cmd}")
+        print(output)
+        print("="*60 + "\n")
+else:
+    print(result) # Error message
 print("\nLab 2.1 complete.")
 
 print("\n--- Lab 2.2: Perform Configuration Backups ---")
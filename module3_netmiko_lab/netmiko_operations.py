@@ -1,22 +1,36 @@
 # netmiko_operations.py
-from netmiko import ConnectHandler
 from netmiko.exceptions import NetmikoTimeoutException, NetmikoAuthenticationException, NetmikoBaseException
-import datetime
 import os
+import re
 import time # For ThreadPoolExecutor to see progress
+from contextlib import contextmanager
+from connection_pool import default_pool
+from backup_store import get_default_store
+from config_tree import ConfigTree, missing_commands
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from results import DeviceResult, failed_result
+from latency import phase_metrics
 
-def get_netmiko_connection(device_info):
+# After 3 timeouts/auth failures in a row a host is skipped (fails immediately) for 60 seconds,
+# instead of every call waiting for the full SSH timeout again.
+ssh_breaker = CircuitBreaker(failure_threshold=3, cooldown=60)
+SSH_TRIP_ERRORS = (NetmikoTimeoutException, NetmikoAuthenticationException, ConnectionError)
+
+def get_netmiko_connection(device_info, pool=default_pool):
     """
-    Establishes and returns a Netmiko connection object.
+    Checks out a Netmiko connection object for the device from the connection pool.
+    Reuses an already authenticated session when one is idle, otherwise opens a new one.
     Handles common connection exceptions.
+    Raises CircuitOpenError without connecting if the host failed repeatedly (see ssh_breaker).
+    Every connection must be handed back with release_netmiko_connection().
     """
     host = device_info.get("host", "Unknown Host")
     try:
-        # Use 'with' statement for ConnectHandler to ensure proper closing
-        # However, for ThreadPoolExecutor, we return the object and let the caller manage 'with'
-        # For simplicity here, we'll connect and return, but a real app might pass connection around.
-        # For this lab, we'll connect inside each operation function.
-        pass # We'll connect inside each specific operation function below
+        with ssh_breaker.guard((host, "ssh"), trip_on=SSH_TRIP_ERRORS):
+            return pool.checkout(device_info)
+    except CircuitOpenError as e:
+        print(f"Error: Skipping {host}: {e}")
+        raise
     except NetmikoTimeoutException:
         print(f"Error: Connection to {host} timed out. Device might be unreachable or SSH is not enabled.")
         raise # Re-raise to propagate the error
@@ -30,88 +44,238 @@ def get_netmiko_connection(device_info):
         print(f"An unexpected error occurred connecting to {host}: {e}")
         raise
 
+def release_netmiko_connection(device_info, net_connect, discard=False, pool=default_pool):
+    """
+    Returns a connection obtained from get_netmiko_connection() to the pool.
+    Pass discard=True if the session may be in a bad state so it gets closed instead of reused.
+    """
+    pool.checkin(device_info, net_connect, discard=discard)
+
+@contextmanager
+def pooled_connection(device_info, pool=default_pool):
+    """
+    Context manager version of get_netmiko_connection()/release_netmiko_connection().
+    Use it like ConnectHandler: 'with pooled_connection(device) as net_connect:'.
+    The session goes back to the pool afterwards instead of being disconnected.
+    """
+    net_connect = get_netmiko_connection(device_info, pool=pool)
+    try:
+        yield net_connect
+    except BaseException:
+        # Don't hand a session that failed mid-command to the next caller
+        release_netmiko_connection(device_info, net_connect, discard=True, pool=pool)
+        raise
+    else:
+        release_netmiko_connection(device_info, net_connect, pool=pool)
+
+def _phase_timer(net_connect, phase, command=""):
+    """Times a step on an open session into latency.phase_metrics, labelled with the session's host and platform."""
+    return phase_metrics.timer(phase, getattr(net_connect, "host", ""), getattr(net_connect, "device_type", ""), command)
+
+def send_timed_command(net_connect, command, **kwargs):
+    """net_connect.send_command() that records its duration as the "command" phase."""
+    with _phase_timer(net_connect, "command", command):
+        return net_connect.send_command(command, **kwargs)
+
+def send_timed_config_set(net_connect, config_commands, **kwargs):
+    """net_connect.send_config_set() that records its duration as the "config" phase."""
+    with _phase_timer(net_connect, "config", "send_config_set"):
+        return net_connect.send_config_set(config_commands, **kwargs)
+
 def get_device_info(device_info, command="show version"):
     """
     Connects to a device and sends a show command.
-    Returns the command output or an error message.
+    The SSH session comes from the connection pool, so repeated calls reuse one login.
+    Returns a DeviceResult: output is the command output; str(result) is the output or an error message.
     """
     host = device_info.get("host", "Unknown Host")
+    started_at = time.monotonic()
     try:
-        with ConnectHandler(**device_info) as net_connect:
+        with pooled_connection(device_info) as net_connect:
             print(f"[{host}] Connected. Sending command: '{command}'...")
-            output = net_connect.send_command(command)
-            return output
+            output = send_timed_command(net_connect, command)
+            return DeviceResult(host, "ssh", "get_device_info", output=output, wall_time=time.monotonic() - started_at)
+    except Exception as e:
+        return failed_result(host, "ssh", "get_device_info", f"Error getting info from {host}: {e}", e,
+                             wall_time=time.monotonic() - started_at)
+
+def _send_commands_pipelined(net_connect, commands, read_timeout):
+    """
+    Writes every command to the channel up front and then splits the replies on the prompt.
+    The device starts the next command as soon as it prints the prompt for the previous one,
+    so there is no round-trip wait between commands.
+    """
+    prompt = net_connect.find_prompt()
+    # Match the prompt only at the start of a line so it isn't confused with config text
+    prompt_pattern = rf"^{re.escape(prompt)}"
+    for command in commands:
+        net_connect.write_channel(net_connect.normalize_cmd(command))
+
+    outputs = {}
+    for command in commands:
+        raw_output = net_connect.read_until_pattern(pattern=prompt_pattern, re_flags=re.M, read_timeout=read_timeout)
+        output = net_connect.strip_command(command, raw_output)
+        outputs[command] = net_connect.strip_prompt(output).strip("\n")
+    return outputs
+
+def run_show_commands(device_info, commands, pipeline=False, read_timeout=30):
+    """
+    Runs a list of show commands over one SSH session.
+    Returns a DeviceResult whose output is a dict of command -> output (str(result) is the error message if the session failed).
+
+    With pipeline=True all commands are written at once and the output is split on the
+    device prompt; with pipeline=False each command waits for its own prompt (send_command).
+    If the same command is listed twice, only its last output is kept.
+    """
+    host = device_info.get("host", "Unknown Host")
+    started_at = time.monotonic()
+    try:
+        with pooled_connection(device_info) as net_connect:
+            print(f"[{host}] Connected. Sending {len(commands)} commands...")
+            if pipeline:
+                with _phase_timer(net_connect, "command", "pipeline"):
+                    outputs = _send_commands_pipelined(net_connect, commands, read_timeout)
+            else:
+                outputs = {}
+                for command in commands:
+                    outputs[command] = send_timed_command(net_connect, command, read_timeout=read_timeout)
+        return DeviceResult(host, "ssh", "run_show_commands", output=outputs, wall_time=time.monotonic() - started_at)
     except Exception as e:
-        return f"Error getting info from {host}: {e}"
+        return failed_result(host, "ssh", "run_show_commands", f"Error running commands on {host}: {e}", e,
+                             wall_time=time.monotonic() - started_at)
 
-def apply_config_commands(device_info, config_commands):
+def apply_config_commands(device_info, config_commands, only_missing=False, running_config=None):
     """
     Connects to a device and applies a list of configuration commands.
-    Returns the configuration output or an error message.
+    With only_missing=True the current config is compared first and only the lines that are
+    not already there are sent (see config_tree.missing_commands); nothing is sent if the
+    device is already compliant. running_config can be passed in (e.g. from the backup store)
+    to skip pulling it from the device.
+    Returns a DeviceResult: output is the configuration session output (None if nothing was sent),
+    ref the list of commands sent; str(result) is the output or a status/error message.
     """
     host = device_info.get("host", "Unknown Host")
+    started_at = time.monotonic()
     try:
-        with ConnectHandler(**device_info) as net_connect:
+        with pooled_connection(device_info) as net_connect:
             print(f"[{host}] Connected. Applying configuration...")
-            output = net_connect.send_config_set(config_commands)
-            return output
+            if only_missing:
+                if running_config is None:
+                    running_config = send_timed_command(net_connect, "show running-config")
+                config_commands = missing_commands(ConfigTree(running_config), config_commands)
+                if not config_commands:
+                    return DeviceResult(host, "ssh", "apply_config_commands", ref=[],
+                                        message=f"{host} already has this configuration, nothing sent.",
+                                        wall_time=time.monotonic() - started_at)
+                print(f"[{host}] Sending {len(config_commands)} missing lines...")
+            output = send_timed_config_set(net_connect, config_commands)
+        return DeviceResult(host, "ssh", "apply_config_commands", output=output, ref=list(config_commands),
+                            wall_time=time.monotonic() - started_at)
     except Exception as e:
-        return f"Error applying config to {host}: {e}"
+        return failed_result(host, "ssh", "apply_config_commands", f"Error applying config to {host}: {e}", e,
+                             wall_time=time.monotonic() - started_at)
 
-def backup_running_config(device_info):
+# Cheap commands that only return the device's "last configuration change" information,
+# and the regex that extracts it. Only a line or two crosses the WAN instead of the full config.
+CHANGE_PROBES = {
+    "cisco_ios": ("show running-config | include Last configuration change", r"Last configuration change at (.+)"),
+    "cisco_xe": ("show running-config | include Last configuration change", r"Last configuration change at (.+)"),
+    "cisco_xr": ("show configuration commit list 1", r"(?m)^\s*1\s+(\d+)\s"), # Latest commit ID
+}
+
+def get_config_change_marker(net_connect, device_type):
+    """
+    Returns a short string that changes whenever the device configuration changes
+    (the IOS "Last configuration change" timestamp or the IOS XR commit ID),
+    or None if the platform has no probe or the device didn't report one.
     """
-    Connects to a device, collects running-config, and saves it to a file.
-    Returns a success message or an error message.
+    probe = CHANGE_PROBES.get(device_type)
+    if probe is None:
+        return None
+    command, pattern = probe
+    match = re.search(pattern, send_timed_command(net_connect, command))
+    return match.group(1).strip() if match else None
+
+def _backup_from_session(net_connect, device_info, skip_unchanged=True):
+    """
+    Backs up the running-config over an open session.
+    Returns (sha256 of the backed up config, short description of what happened).
+    With skip_unchanged=True the change marker is checked first and the full
+    "show running-config" is skipped when it matches the last stored backup.
     """
     host = device_info.get("host", "Unknown Host")
+    store = get_default_store()
+    marker = get_config_change_marker(net_connect, device_info.get("device_type"))
+    if skip_unchanged and marker is not None:
+        latest = store.latest(host)
+        if latest is not None and latest.get("change_marker") == marker:
+            store.record(host, latest["sha256"], change_marker=marker)
+            return latest["sha256"], f"config unchanged since last backup ({marker}), full pull skipped"
+
+    running_config = send_timed_command(net_connect, "show running-config")
+    sha, is_new = store.save(host, running_config, change_marker=marker)
+    if is_new:
+        return sha, f"new config {sha[:12]} stored in {store.root}"
+    return sha, f"config unchanged ({sha[:12]}), nothing new written"
+
+def backup_running_config(device_info, skip_unchanged=True):
+    """
+    Connects to a device, collects running-config, and saves it to the backup store.
+    A config that is identical to one already stored is not written again, and with
+    skip_unchanged=True it is not even pulled if the device reports no change since the last backup.
+    Returns a DeviceResult: ref is the sha256 of the stored config; str(result) is a success or error message.
+    """
+    host = device_info.get("host", "Unknown Host")
+    started_at = time.monotonic()
     try:
-        with ConnectHandler(**device_info) as net_connect:
+        with pooled_connection(device_info) as net_connect:
             print(f"[{host}] Connected. Collecting running-config for backup...")
-            running_config = net_connect.send_command("show running-config")
-            
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_filename = f"{host}_running_config_{timestamp}.txt"
-            
-            with open(backup_filename, "w") as f:
-                f.write(running_config)
-            
-            return f"Successfully backed up {host} to {backup_filename}"
+            sha, description = _backup_from_session(net_connect, device_info, skip_unchanged=skip_unchanged)
+
+        return DeviceResult(host, "ssh", "backup_running_config", ref=sha,
+                            message=f"Successfully backed up {host}: {description}",
+                            wall_time=time.monotonic() - started_at)
     except Exception as e:
-        return f"Error backing up {host}: {e}"
+        return failed_result(host, "ssh", "backup_running_config", f"Error backing up {host}: {e}", e,
+                             wall_time=time.monotonic() - started_at)
 
 def process_device_concurrently(device_info):
     """
     Function to be executed by each thread for a single device in concurrent labs.
-    Performs multiple operations and returns a summary.
+    Performs multiple operations and returns a DeviceResult: ref is the sha256 of the backup,
+    str(result) the summary of what was done (or why it failed).
     """
     host = device_info.get("host", "Unknown Host")
     summary = [f"--- Processing {host} ---"]
+    started_at = time.monotonic()
+
+    def failed(message, e):
+        return failed_result(host, "ssh", "process_device_concurrently", message, e,
+                             wall_time=time.monotonic() - started_at)
+
     try:
-        with ConnectHandler(**device_info) as net_connect:
+        with pooled_connection(device_info) as net_connect:
             # 1. Get version
-            version_output = net_connect.send_command("show version")
+            version_output = send_timed_command(net_connect, "show version")
             summary.append(f"  Version: {version_output.splitlines()}")
 
             # 2. Apply simple config
             config_commands = [f"hostname {host}-AUTOMATED", "interface Loopback99", "ip address 10.0.0.99 255.255.255.255", "no shutdown"]
-            net_connect.send_config_set(config_commands)
+            send_timed_config_set(net_connect, config_commands)
             summary.append("  Config applied (hostname, Loopback99).")
 
             # 3. Backup running-config
-            running_config = net_connect.send_command("show running-config")
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_filename = f"{host}_running_config_{timestamp}.txt"
-            with open(backup_filename, "w") as f:
-                f.write(running_config)
-            summary.append(f"  Backed up running-config to {backup_filename}.")
+            sha, description = _backup_from_session(net_connect, device_info)
+            summary.append(f"  Backed up running-config: {description}.")
         
         summary.append(f"--- {host} Processed Successfully ---")
-        return "\n".join(summary)
-    except NetmikoTimeoutException:
-        return f"--- {host} Failed: Connection timed out. Device unreachable or SSH issue. ---"
-    except NetmikoAuthenticationException:
-        return f"--- {host} Failed: Authentication failed. Check username/password/enable password. ---"
+        return DeviceResult(host, "ssh", "process_device_concurrently", ref=sha, message="\n".join(summary),
+                            wall_time=time.monotonic() - started_at)
+    except NetmikoTimeoutException as e:
+        return failed(f"--- {host} Failed: Connection timed out. Device unreachable or SSH issue. ---", e)
+    except NetmikoAuthenticationException as e:
+        return failed(f"--- {host} Failed: Authentication failed. Check username/password/enable password. ---", e)
     except NetmikoBaseException as e:
-        return f"--- {host} Failed: Netmiko error - {e} ---"
+        return failed(f"--- {host} Failed: Netmiko error - {e} ---", e)
     except Exception as e:
-        return f"--- {host} Failed: Unexpected error - {e} ---"
\ No newline at end of file
+        return failed(f"--- {host} Failed: Unexpected error - {e} ---", e)
\ No newline at end of file
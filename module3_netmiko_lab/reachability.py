@@ -0,0 +1,73 @@
+# reachability.py
+import asyncio
+
+PROBE_PORTS = (22, 830, 443) # SSH, NETCONF, RESTCONF
+SSH_ONLY = (22,) # 22 stands for each device's own SSH port (see ssh_port)
+PROBE_TIMEOUT = 1.5 # Seconds per TCP connect; a live device on the LAN answers in milliseconds
+MAX_CONCURRENT_PROBES = 500 # Keeps us well below the open file limit on big inventories
+
+
+def ssh_port(device_info):
+    """The port Netmiko will connect to for this device."""
+    return device_info.get("port", 22)
+
+
+async def _probe_port(host, port, timeout, semaphore):
+    async with semaphore:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True
+
+
+async def _probe_inventory(devices, ports, timeout, max_concurrent):
+    semaphore = asyncio.Semaphore(max_concurrent)
+    probes = []
+    for device_info in devices:
+        # Probe the device's own SSH port instead of 22 if it uses a different one
+        device_ports = [ssh_port(device_info) if port == 22 else port for port in ports]
+        for port in device_ports:
+            probes.append((device_info["host"], port))
+    answers = await asyncio.gather(*(_probe_port(host, port, timeout, semaphore) for host, port in probes))
+    results = {}
+    for (host, port), is_open in zip(probes, answers):
+        results.setdefault(host, {})[port] = is_open
+    return results
+
+
+def check_reachability(devices, ports=PROBE_PORTS, timeout=PROBE_TIMEOUT, max_concurrent=MAX_CONCURRENT_PROBES):
+    """
+    TCP-connects to every port of every device (no login, nothing is sent), up to max_concurrent
+    connects at a time. Returns {host: {port: True/False}}.
+    Live devices answer in milliseconds, so the time is set by the dead ones: at worst one timeout
+    per max_concurrent probes (devices x ports), e.g. 5,000 devices x 1 port = 10 x 1.5s,
+    instead of one SSH timeout per dead device in the worker pool.
+    """
+    return asyncio.run(_probe_inventory(list(devices), ports, timeout, max_concurrent))
+
+
+def split_by_reachability(devices, ports=SSH_ONLY, timeout=PROBE_TIMEOUT, max_concurrent=MAX_CONCURRENT_PROBES):
+    """
+    Probes the inventory and returns (reachable, unreachable, port_status).
+    A device is reachable if its SSH port answers, so only that port is probed unless `ports` asks
+    for more (e.g. PROBE_PORTS to also see NETCONF/RESTCONF in port_status).
+    port_status is the check_reachability() result.
+    """
+    devices = list(devices)
+    if 22 not in ports:
+        ports = (22,) + tuple(ports)
+    port_status = check_reachability(devices, ports, timeout, max_concurrent)
+    reachable = []
+    unreachable = []
+    for device_info in devices:
+        if port_status[device_info["host"]].get(ssh_port(device_info)):
+            reachable.append(device_info)
+        else:
+            unreachable.append(device_info)
+    return reachable, unreachable, port_status
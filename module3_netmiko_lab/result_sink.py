@@ -0,0 +1,118 @@
+# result_sink.py
+import json
+import os
+import threading
+import time
+from results import DeviceResult
+
+FLUSH_EVERY = 100 # Results buffered in memory before they are written to the file
+FSYNC_INTERVAL = 5.0 # Max seconds between write+fsync (a crash loses at most the results of this long)
+
+
+class JsonlResultSink:
+    """
+    Appends device results to a JSON Lines file, one result per line, as they complete.
+
+    Results are buffered and written (and fsync'ed) when FLUSH_EVERY have built up or FSYNC_INTERVAL
+    seconds have passed since the last write, whichever comes first, so a 50,000 device run doesn't
+    do 50,000 disk syncs and a slow run still reaches the disk every few seconds.
+    The interval is checked when a result is written (a pause between results waits for the next one).
+    Use it as a context manager so the last batch is written:
+
+        with JsonlResultSink("fleet_results.jsonl") as sink:
+            for result in run_fleet(devices, process_device_concurrently):
+                sink.write(result)
+
+    include_output=False leaves out the (possibly large) output field and keeps only the
+    status, timings, ref and error of each result.
+    """
+
+    def __init__(self, path, flush_every=FLUSH_EVERY, fsync_interval=FSYNC_INTERVAL, include_output=True):
+        self.path = path
+        self.flush_every = flush_every
+        self.fsync_interval = fsync_interval
+        self.include_output = include_output
+        self.written = 0
+        self._buffer = []
+        self._last_fsync = time.monotonic()
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, result):
+        """Adds one DeviceResult (or a plain dict) to the file."""
+        record = result.as_dict() if isinstance(result, DeviceResult) else dict(result)
+        if not self.include_output:
+            record.pop("output", None)
+        record["timestamp"] = time.time()
+        # Compact separators; the reader relies on them for its quick pre-filter
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        with self._lock:
+            self._buffer.append(line)
+            self.written += 1
+            due = time.monotonic() - self._last_fsync >= self.fsync_interval
+            if due or len(self._buffer) >= self.flush_every:
+                self._flush(sync=due)
+
+    def _flush(self, sync):
+        if self._buffer:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._buffer.clear()
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+            self._last_fsync = time.monotonic()
+
+    def flush(self):
+        """Writes buffered results and syncs the file to disk."""
+        with self._lock:
+            self._flush(sync=True)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._flush(sync=True)
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_results(path, host=None, status=None, operation=None, error_type=None, since=None, as_objects=True):
+    """
+    Streams results back from a JSON Lines file, one line at a time, optionally filtered by
+    host, status ("ok"/"failed"), operation, error_type or since (only results written at/after this epoch time).
+    Yields DeviceResult objects (or the raw dicts with as_objects=False, which include the timestamp).
+
+    Lines that can't match a host/status/operation filter are skipped before they are parsed,
+    and a half-written last line (the run was killed) is ignored.
+    """
+    needles = []
+    for key, value in (("host", host), ("status", status), ("operation", operation)):
+        if value is not None:
+            needles.append(f'"{key}":{json.dumps(value)}')
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if any(needle not in line for needle in needles):
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if host is not None and record.get("host") != host:
+                continue
+            if status is not None and record.get("status") != status:
+                continue
+            if operation is not None and record.get("operation") != operation:
+                continue
+            if error_type is not None and record.get("error_type") != error_type:
+                continue
+            if since is not None and record.get("timestamp", 0) < since:
+                continue
+            if as_objects:
+                yield DeviceResult(**{name: record[name] for name in DeviceResult.__slots__ if name in record})
+            else:
+                yield record
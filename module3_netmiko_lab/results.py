@@ -0,0 +1,117 @@
+# results.py
+from array import array
+
+
+def output_failed(output):
+    """
+    For operations that still report errors as text, e.g. "Error backing up 10.0.0.1: ...".
+    """
+    return isinstance(output, str) and (output.startswith("Error") or " Failed:" in output)
+
+
+class DeviceResult:
+    """
+    Outcome of one operation on one device.
+
+    status is "ok" or "failed"; error_type is the exception class name (or None).
+    output is what the operation returned (command output, dict of outputs, ...), ref a short
+    reference to anything stored elsewhere (e.g. the backup's sha256), message the human-readable
+    summary printed by str(result). queue_time is how long the job waited for a free slot,
+    wall_time how long it ran (seconds).
+    """
+
+    __slots__ = ("host", "protocol", "operation", "status", "output", "ref", "message", "error", "error_type",
+                 "queue_time", "wall_time")
+
+    def __init__(self, host, protocol, operation, status="ok", output=None, ref=None, message=None,
+                 error=None, error_type=None, queue_time=0.0, wall_time=0.0):
+        self.host = host
+        self.protocol = protocol
+        self.operation = operation
+        self.status = status
+        self.output = output
+        self.ref = ref
+        self.message = message
+        self.error = error
+        self.error_type = error_type
+        self.queue_time = queue_time
+        self.wall_time = wall_time
+
+    @property
+    def failed(self):
+        return self.status != "ok"
+
+    def __str__(self):
+        if self.failed:
+            return str(self.error)
+        return str(self.message if self.message is not None else self.output)
+
+    def __repr__(self):
+        return f"DeviceResult({self.host!r}, {self.protocol!r}, {self.operation!r}, status={self.status!r})"
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def failed_result(host, protocol, operation, message, exc=None, wall_time=0.0):
+    """DeviceResult for a failed operation; error_type is taken from the exception if there is one."""
+    return DeviceResult(host, protocol, operation, status="failed", error=message,
+                        error_type=type(exc).__name__ if exc is not None else None, wall_time=wall_time)
+
+
+def as_result(value, host, protocol, operation):
+    """
+    Turns whatever an operation returned into a DeviceResult: a DeviceResult is returned as-is,
+    anything else becomes its output (text starting with "Error" counts as a failure).
+    """
+    if isinstance(value, DeviceResult):
+        return value
+    if output_failed(value):
+        return DeviceResult(host, protocol, operation, status="failed", error=value)
+    return DeviceResult(host, protocol, operation, output=value)
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def aggregate_results(results):
+    """
+    Builds fleet-level stats from DeviceResults in one pass:
+    totals, failed hosts, failures per error type, per-operation ok/failed counts and
+    wall/queue time avg, max, p50 and p95 (seconds).
+    """
+    summary = {
+        "total": 0,
+        "succeeded": 0,
+        "failed": 0,
+        "failed_hosts": [],
+        "error_types": {},
+        "by_operation": {},
+    }
+    wall_times = array("d")
+    queue_times = array("d")
+    for result in results:
+        summary["total"] += 1
+        counts = summary["by_operation"].setdefault(result.operation, {"ok": 0, "failed": 0})
+        if result.failed:
+            summary["failed"] += 1
+            summary["failed_hosts"].append(result.host)
+            error_type = result.error_type or "error"
+            summary["error_types"][error_type] = summary["error_types"].get(error_type, 0) + 1
+            counts["failed"] += 1
+        else:
+            summary["succeeded"] += 1
+            counts["ok"] += 1
+        wall_times.append(result.wall_time)
+        queue_times.append(result.queue_time)
+
+    for name, values in (("wall_time", wall_times), ("queue_time", queue_times)):
+        values = sorted(values)
+        summary[f"avg_{name}"] = sum(values) / len(values) if values else 0.0
+        summary[f"max_{name}"] = values[-1] if values else 0.0
+        summary[f"p50_{name}"] = _percentile(values, 0.50)
+        summary[f"p95_{name}"] = _percentile(values, 0.95)
+    return summary
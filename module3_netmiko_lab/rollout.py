@@ -0,0 +1,77 @@
+# rollout.py
+import math
+import threading
+from fleet_runner import run_fleet, DEFAULT_MAX_WORKERS
+
+
+def plan_waves(devices, canary_size=1, growth_factor=2, max_wave_size=500):
+    """
+    Splits the inventory into waves: a canary wave of canary_size devices, then waves that grow
+    by growth_factor each time (capped at max_wave_size).
+    E.g. 100 devices, canary 1, factor 2 -> waves of 1, 2, 4, 8, 16, 32, 37.
+    """
+    devices = list(devices)
+    waves = []
+    size = max(canary_size, 1)
+    start = 0
+    while start < len(devices):
+        waves.append(devices[start:start + size])
+        start += size
+        size = min(max(int(size * growth_factor), size + 1), max_wave_size)
+    return waves
+
+
+def run_rollout(devices, operation, canary_size=1, growth_factor=2, max_wave_size=500,
+                max_workers=DEFAULT_MAX_WORKERS, success_threshold=0.95, on_result=None):
+    """
+    Runs a config change (operation(device_info), e.g. process_device_concurrently) in waves.
+
+    Each wave runs on the fleet runner with up to max_workers devices in parallel. The next wave only
+    starts if the wave's success ratio is at least success_threshold. As soon as a wave has more
+    failures than the threshold allows, no more of its devices are started (the ones already running
+    finish and are reported), so a systemic problem (bad template, AAA down) hits a handful of
+    devices instead of the whole fleet.
+
+    on_result is called with every DeviceResult (see fleet_runner.run_fleet) as it completes.
+    Returns a report dict: waves (per-wave size/succeeded/failed/success_ratio), halted and no_result:
+    hosts that were never started (devices of the failed wave that were still queued, and later waves).
+    """
+    waves = plan_waves(devices, canary_size, growth_factor, max_wave_size)
+    report = {"waves": [], "halted": False, "no_result": []}
+
+    for number, wave in enumerate(waves, start=1):
+        # Failures the wave can have and still reach success_threshold (the epsilon absorbs float error,
+        # e.g. 10 * 0.9 = 9.000000000000002)
+        allowed_failures = len(wave) - math.ceil(len(wave) * success_threshold - 1e-9)
+        stop = threading.Event()
+        wave_report = {"wave": number, "size": len(wave), "succeeded": 0, "failed": 0, "success_ratio": 0.0}
+        attempted_hosts = set()
+        print(f"--- Rollout wave {number}/{len(waves)}: {len(wave)} devices ---")
+
+        for result in run_fleet(wave, operation, max_workers=min(max_workers, len(wave)), stop=stop):
+            attempted_hosts.add(result.host)
+            if result.failed:
+                wave_report["failed"] += 1
+            else:
+                wave_report["succeeded"] += 1
+            if on_result is not None:
+                on_result(result)
+            if wave_report["failed"] > allowed_failures:
+                # This wave can no longer pass: start no more devices, but collect the ones already running
+                stop.set()
+
+        attempted = wave_report["succeeded"] + wave_report["failed"]
+        wave_report["success_ratio"] = wave_report["succeeded"] / attempted if attempted else 0.0
+        report["waves"].append(wave_report)
+
+        if wave_report["failed"] > allowed_failures:
+            report["halted"] = True
+            print(f"--- Rollout halted at wave {number}: success ratio {wave_report['success_ratio']:.0%} "
+                  f"is below the {success_threshold:.0%} threshold ---")
+
+            # Devices of this wave that were never started, plus every later wave
+            no_result = [d for d in wave if d.get("host", "Unknown Host") not in attempted_hosts]
+            no_result += [d for later in waves[number:] for d in later]
+            report["no_result"] = [d.get("host", "Unknown Host") for d in no_result]
+            break
+    return report
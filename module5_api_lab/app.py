@@ -1,41 +1,77 @@
 # app.py
-from flask import Flask, render_template
-import time
-from iosxe_api_functions import (
-    get_cpu_utilization_restconf, get_memory_utilization_restconf,
-    get_gigabitethernet1_utilization_netconf
-)
+from flask import Flask, Response, jsonify, render_template
+import json
+import os
+from metrics_poller import MetricsPoller
+from latency import PhaseMetrics, phase_metrics
+from config import DASHBOARD_STREAM_KEEPALIVE, LATENCY_EXPORT_FILES
 
 app = Flask(__name__)
 
+# Collects RESTCONF/NETCONF metrics in the background; page loads only read its snapshot
+poller = MetricsPoller()
+
+@app.before_request
+def start_poller():
+    # Started on the first request so it runs in the process that serves pages
+    # (with debug=True the reloader starts the app in a child process)
+    poller.start()
+
 @app.route('/')
 def index():
     """
-    Main dashboard route. Fetches metrics from RESTCONF and NETCONF and renders the HTML template.
+    Main dashboard route. Renders the HTML template from the latest metrics snapshot
+    (RESTCONF CPU & memory, NETCONF GigabitEthernet1 stats) collected by the background poller.
+    """
+    return render_template('index.html', **poller.snapshot())
+
+@app.route('/api/metrics')
+def metrics():
+    """Returns the latest metrics snapshot as JSON."""
+    return jsonify(poller.snapshot())
+
+@app.route('/stream')
+def stream():
+    """
+    Server-Sent Events stream used by the dashboard page instead of reloading itself.
+    After each poll only the values that changed since the last event are sent, as one JSON object.
     """
-    # --- Fetch RESTCONF Data (CPU & Memory) ---
-    cpu_rc = get_cpu_utilization_restconf()
-    mem_used_rc, mem_total_rc = get_memory_utilization_restconf()
-    
-    # --- Fetch NETCONF Data (GigabitEthernet1 Utilization) ---
-    gigabit_stats_nc = get_gigabitethernet1_utilization_netconf()
-
-    # Render the HTML template with the fetched data
-    return render_template(
-        'index.html',
-        # RESTCONF Data
-        cpu_util_rc=cpu_rc,
-        memory_used_rc=mem_used_rc,
-        memory_total_rc=mem_total_rc,
-        # NETCONF Data
-        gig1_in_octets=gigabit_stats_nc['in_octets'],
-        gig1_out_octets=gigabit_stats_nc['out_octets'],
-        gig1_in_pkts=gigabit_stats_nc['in_pkts'],
-        gig1_out_pkts=gigabit_stats_nc['out_pkts'],
-        gig1_rx_kbps=gigabit_stats_nc['rx-kbps'],
-        gig1_tx_kbps=gigabit_stats_nc['tx-kbps'],
-        current_time=time.strftime("%Y-%m-%d %H:%M:%S")
-    )
+    def events():
+        sent = {}
+        version = None
+        while True:
+            version, snapshot = poller.wait_for_update(version, timeout=DASHBOARD_STREAM_KEEPALIVE)
+            changed = {key: value for key, value in snapshot.items() if key not in sent or sent[key] != value}
+            if changed:
+                sent.update(changed)
+                yield f"data: {json.dumps(changed)}\n\n"
+            else:
+                yield ": keep-alive\n\n" # SSE comment, keeps proxies from closing the connection
+
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+def _latency_metrics():
+    """This app's RESTCONF/NETCONF phase histograms merged with the ones saved by other jobs (LATENCY_EXPORT_FILES)."""
+    merged = PhaseMetrics()
+    merged.merge_json(phase_metrics.to_json())
+    for path in LATENCY_EXPORT_FILES:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+        try:
+            with open(path, encoding="utf-8") as f:
+                merged.merge_json(json.load(f))
+        except (OSError, ValueError, KeyError):
+            continue # Not written yet or half-written; served on the next scrape
+    return merged
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Per-phase latency (connect, RPC, command, ...) in the Prometheus text format."""
+    return Response(_latency_metrics().prometheus_text(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/latency')
+def latency():
+    """Per-phase latency histograms as JSON (count, sum, min, max, p50/p90/p99 and buckets per series)."""
+    return jsonify(_latency_metrics().to_json())
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=5001)
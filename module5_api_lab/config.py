@@ -10,4 +10,48 @@ IOSXE_DEVICE_INFO = {
     "restconf_port": 443, # Default HTTPS port for RESTCONF
     "netconf_port": 830, # Default NETCONF over SSH port
     "verify_ssl": False # Set to True in production for RESTCONF if you have proper CA certificates
-}
\ No newline at end of file
+}
+
+# All IOS XE devices used by the multi-device collectors (e.g. get_interface_statistics_netconf).
+# Add more dictionaries with the same keys as IOSXE_DEVICE_INFO to monitor more routers.
+IOSXE_DEVICES = [
+    IOSXE_DEVICE_INFO,
+]
+
+# --- RESTCONF HTTP Session Settings ---
+# All RESTCONF helpers share one keep-alive session per device, so the TLS handshake
+# to port 443 is paid once instead of on every request.
+RESTCONF_SESSION_SETTINGS = {
+    "pool_maxsize": 4, # Max open (reused) HTTPS connections per device
+    "retries": 2, # Retries on connection errors and 502/503/504 responses
+    "backoff_factor": 0.5, # Wait 0.5s, 1s, ... between retries
+    "connect_timeout": 5, # Seconds to open the TCP/TLS connection
+    "read_timeout": 15 # Seconds to wait for the response
+}
+
+# --- Dashboard Settings ---
+# The dashboard reads metrics from an in-memory snapshot that a background thread refreshes
+# every DASHBOARD_POLL_INTERVAL seconds, no matter how many browsers are open.
+DASHBOARD_POLL_INTERVAL = 5
+# All metric sources are queried in parallel; a source that hasn't answered within
+# DASHBOARD_FETCH_DEADLINE seconds keeps its previous value and is shown as stale.
+DASHBOARD_FETCH_DEADLINE = 4
+# The live update stream (/stream) sends a keep-alive comment if nothing changed for this many seconds
+DASHBOARD_STREAM_KEEPALIVE = 15
+
+# --- Circuit Breaker Settings ---
+# After "failure_threshold" timeouts/auth failures in a row, RESTCONF or NETCONF calls to that host
+# fail immediately for "cooldown" seconds (the dashboard shows the last values as stale) instead of
+# waiting for a full connect timeout on every refresh.
+CIRCUIT_BREAKER_SETTINGS = {
+    "failure_threshold": 3,
+    "cooldown": 30
+}
+
+# --- Latency Metrics ---
+# app.py serves per-phase latency histograms on /metrics (Prometheus) and /api/latency (JSON):
+# the dashboard's own RESTCONF/NETCONF calls, plus the histograms saved by these files
+# (e.g. latency_metrics.json written by the module 3 multi-device lab).
+LATENCY_EXPORT_FILES = [
+    "../module3_netmiko_lab/latency_metrics.json",
+]
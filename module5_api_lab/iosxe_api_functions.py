@@ -1,9 +1,15 @@
 # iosxe_api_functions.py
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
-from ncclient import manager
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from ncclient.operations import RPCError
+from ncclient.transport.errors import AuthenticationError, SSHError
+from ncclient.operations.errors import TimeoutExpiredError
 import xml.etree.ElementTree as ET
+from lxml import etree # ncclient replies are already parsed with lxml
 import xmltodict # For easier XML to dict conversion
 import logging
 
@@ -13,7 +19,10 @@ urllib3.disable_warnings()
 ncclient_logger = logging.getLogger('ncclient')
 ncclient_logger.setLevel(logging.WARNING)
 
-from config import IOSXE_DEVICE_INFO # Import device info from config.py
+from config import IOSXE_DEVICE_INFO, IOSXE_DEVICES, RESTCONF_SESSION_SETTINGS, CIRCUIT_BREAKER_SETTINGS # Import device info from config.py
+from netconf_sessions import get_netconf_session # Long-lived NETCONF sessions shared by all helpers
+from circuit_breaker import CircuitBreaker, CircuitOpenError # Fail fast on hosts that keep timing out
+from latency import phase_metrics # Per-phase latency histograms, served on /metrics by app.py
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -24,24 +33,87 @@ RESTCONF_BASE_URL = f"https://{IOSXE_DEVICE_INFO['host']}:{IOSXE_DEVICE_INFO['re
 RESTCONF_MONITORING_URL = f"https://{IOSXE_DEVICE_INFO['host']}:{IOSXE_DEVICE_INFO['restconf_port']}/restconf/data/ietf-restconf-monitoring:restconf-state/capabilities"
 
 
+# --- RESTCONF Session Pool ---
+# One requests.Session per device. The session keeps its HTTPS connections open (keep-alive),
+# so every RESTCONF helper reuses a warm TLS connection instead of doing a new handshake.
+_restconf_sessions = {}
+_restconf_sessions_lock = threading.Lock()
+
+def _get_restconf_session(device_info=IOSXE_DEVICE_INFO):
+    """Returns the shared keep-alive RESTCONF session for a device, creating it on first use."""
+    key = (device_info['host'], device_info['restconf_port'], device_info['username'])
+    with _restconf_sessions_lock:
+        session = _restconf_sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            session.auth = (device_info['username'], device_info['password'])
+            session.verify = device_info['verify_ssl']
+            retry = Retry(
+                total=RESTCONF_SESSION_SETTINGS['retries'],
+                backoff_factor=RESTCONF_SESSION_SETTINGS['backoff_factor'],
+                status_forcelist=(502, 503, 504),
+                allowed_methods=frozenset(["GET"]) # Only retry idempotent requests
+            )
+            adapter = HTTPAdapter(
+                pool_connections=1, # One host per session
+                pool_maxsize=RESTCONF_SESSION_SETTINGS['pool_maxsize'],
+                max_retries=retry
+            )
+            session.mount("https://", adapter)
+            _restconf_sessions[key] = session
+        return session
+
+def _restconf_timeout():
+    return (RESTCONF_SESSION_SETTINGS['connect_timeout'], RESTCONF_SESSION_SETTINGS['read_timeout'])
+
+
+# --- Circuit Breaker ---
+# One breaker for both APIs, keyed by (host, "restconf") and (host, "netconf"),
+# so RESTCONF being down doesn't block NETCONF calls and vice versa.
+api_breaker = CircuitBreaker(**CIRCUIT_BREAKER_SETTINGS)
+
+class RestconfAuthError(Exception):
+    """HTTP 401 from the RESTCONF server (wrong credentials)."""
+
+RESTCONF_TRIP_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout, RestconfAuthError)
+NETCONF_TRIP_ERRORS = (AuthenticationError, SSHError, TimeoutExpiredError, TimeoutError, ConnectionError)
+
+def _restconf_get(url, headers, device_info=IOSXE_DEVICE_INFO):
+    """GET over the shared session, guarded by the circuit breaker. Returns the requests Response."""
+    resource = url.split("/restconf/data/", 1)[-1] # e.g. Cisco-IOS-XE-process-cpu-oper:cpu-usage/...
+    with api_breaker.guard((device_info['host'], "restconf"), trip_on=RESTCONF_TRIP_ERRORS):
+        with phase_metrics.timer("restconf_request", device_info['host'], "cisco_xe", resource):
+            response = _get_restconf_session(device_info).get(url, headers=headers, timeout=_restconf_timeout())
+        if response.status_code == 401:
+            raise RestconfAuthError(f"401 Unauthorized for {url}")
+        return response
+
+def _netconf_run(operation, device_info=IOSXE_DEVICE_INFO, rpc="get"):
+    """
+    Runs operation(m) on the device's NETCONF session, guarded by the circuit breaker.
+    rpc is the label its duration is recorded under (phase "netconf_rpc").
+    """
+    with api_breaker.guard((device_info['host'], "netconf"), trip_on=NETCONF_TRIP_ERRORS):
+        with phase_metrics.timer("netconf_rpc", device_info['host'], "cisco_xe", rpc):
+            return get_netconf_session(device_info).run(operation)
+
+
 # --- Generic API Helper Functions (used by discovery and data retrieval) ---
 def _make_restconf_get_request(path):
-    """Internal helper to make a RESTCONF GET request."""
+    """Internal helper to make a RESTCONF GET request over the device's shared session."""
     full_url = f"{RESTCONF_BASE_URL}/{path}"
     headers = {
         "Content-Type": "application/yang-data+json",
         "Accept": "application/yang-data+json"
     }
     try:
-        response = requests.get(
-            full_url,
-            headers=headers,
-            auth=(IOSXE_DEVICE_INFO['username'], IOSXE_DEVICE_INFO['password']),
-            verify=IOSXE_DEVICE_INFO['verify_ssl']
-        )
+        response = _restconf_get(full_url, headers)
         response.raise_for_status()
         return response.json()
-    except requests.exceptions.RequestException as e:
+    except CircuitOpenError as e:
+        logging.warning(f"RESTCONF Request for {path} skipped: {e}")
+        return None
+    except (requests.exceptions.RequestException, RestconfAuthError) as e:
         logging.error(f"RESTCONF Request Error for {path}: {e}")
         return None
     except json.JSONDecodeError:
@@ -51,31 +123,32 @@ def _make_restconf_get_request(path):
         logging.error(f"RESTCONF Unexpected Error for {path}: {e}")
         return None
 
-def _make_netconf_get_request(xml_filter):
-    """Internal helper to make a NETCONF GET request."""
-    host = IOSXE_DEVICE_INFO['host']
-    username = IOSXE_DEVICE_INFO['username']
-    password = IOSXE_DEVICE_INFO['password']
-    port = IOSXE_DEVICE_INFO['netconf_port']
+def _make_netconf_get_request(xml_filter, device_info=IOSXE_DEVICE_INFO, parse="dict"):
+    """
+    Internal helper to make a NETCONF GET request over the device's long-lived session.
+    parse="dict" converts the whole reply with xmltodict. parse="tree" returns the <data> lxml
+    element ncclient already parsed, so callers can pull out just the leaves they need
+    (see _xpath_columns) without building a dict of the whole document.
+    """
+    host = device_info['host']
 
     try:
-        logging.info(f"Connecting to {host}:{port} via NETCONF...")
-        with manager.connect(host=host,
-                             port=port,
-                             username=username,
-                             password=password,
-                             hostkey_verify=False, # Set to True in production with proper host keys
-                             device_params={'name': 'iosxe'},
-                             allow_agent=False,
-                             look_for_keys=False) as m:
-            logging.info(f"Successfully connected to {host} via NETCONF. Sending GET request.")
-            
-            netconf_reply = m.get(filter=('subtree', xml_filter))
-            raw_xml = netconf_reply.xml
-            parsed_data = xmltodict.parse(raw_xml)
-            
-            return parsed_data
+        logging.info(f"Sending NETCONF GET request to {host}...")
+        netconf_reply = _netconf_run(
+            lambda m: m.get(filter=('subtree', xml_filter)),
+            device_info
+        )
+        if parse == "tree":
+            return netconf_reply.data_ele
 
+        raw_xml = netconf_reply.xml
+        parsed_data = xmltodict.parse(raw_xml)
+
+        return parsed_data
+
+    except CircuitOpenError as e:
+        logging.warning(f"NETCONF GET request to {host} skipped: {e}")
+        return None
     except RPCError as e:
         logging.error(f"NETCONF RPC Error for {host}: {e.info}")
         logging.error(f"Error message: {e.message}")
@@ -85,6 +158,34 @@ def _make_netconf_get_request(xml_filter):
         return None
 
 
+# --- Lazy XML Helpers (work on the parsed tree or stream raw XML instead of converting it to dicts) ---
+NETCONF_NAMESPACES = {
+    "if": "urn:ietf:params:xml:ns:yang:ietf-interfaces",
+}
+
+_compiled_xpaths = {}
+
+def _compiled_xpath(path):
+    """Compiles an XPath expression once and reuses it on later calls."""
+    xpath = _compiled_xpaths.get(path)
+    if xpath is None:
+        xpath = _compiled_xpaths[path] = etree.XPath(path, namespaces=NETCONF_NAMESPACES, smart_strings=False)
+    return xpath
+
+def _xpath_columns(data_ele, row_xpath, field_xpaths):
+    """
+    Extracts columns from an lxml element without converting the whole document.
+    row_xpath selects one element per row (e.g. every interface), field_xpaths maps a column
+    name to an XPath relative to the row. A missing leaf becomes None.
+    """
+    fields = {name: _compiled_xpath(f"string({path})") for name, path in field_xpaths.items()}
+    columns = {name: [] for name in field_xpaths}
+    for row in _compiled_xpath(row_xpath)(data_ele):
+        for name, xpath in fields.items():
+            columns[name].append(xpath(row) or None)
+    return columns
+
+
 # --- Capability Discovery Functions ---
 
 def discover_restconf_capabilities():
@@ -93,12 +194,7 @@ def discover_restconf_capabilities():
         "Accept": "application/yang-data+json"
     }
     try:
-        response = requests.get(
-            RESTCONF_MONITORING_URL,
-            headers=headers,
-            auth=(IOSXE_DEVICE_INFO['username'], IOSXE_DEVICE_INFO['password']),
-            verify=IOSXE_DEVICE_INFO['verify_ssl']
-        )
+        response = _restconf_get(RESTCONF_MONITORING_URL, headers)
         response.raise_for_status()
         data = response.json()
         
@@ -119,32 +215,21 @@ def discover_restconf_capabilities():
 def discover_netconf_capabilities():
     """Discovers and returns supported YANG modules via NETCONF."""
     host = IOSXE_DEVICE_INFO['host']
-    username = IOSXE_DEVICE_INFO['username']
-    password = IOSXE_DEVICE_INFO['password']
-    port = IOSXE_DEVICE_INFO['netconf_port']
 
     try:
-        logging.info(f"Connecting to {host}:{port} for NETCONF capabilities discovery...")
-        with manager.connect(host=host,
-                             port=port,
-                             username=username,
-                             password=password,
-                             hostkey_verify=False,
-                             device_params={'name': 'iosxe'},
-                             allow_agent=False,
-                             look_for_keys=False) as m:
-            logging.info(f"Successfully connected to {host} for NETCONF capabilities. Retrieving capabilities.")
-            
-            modules = []
-            # ncclient's manager object holds the connected capabilities
-            for capability in m.connected_capabilities:
-                # Capabilities are typically in the format:
-                # urn:ietf:params:xml:ns:netconf:base:1.0
-                # urn:ietf:params:xml:ns:yang:ietf-interfaces?module=ietf-interfaces&revision=2018-02-20
-                if 'module=' in capability:
-                    module_name = capability.split('module=')[1].split('&')[0]
-                    modules.append(module_name)
-            return sorted(list(set(modules))) # Return unique sorted module names
+        logging.info(f"Retrieving NETCONF capabilities from {host}...")
+        # ncclient's manager object holds the capabilities advertised in the server hello
+        capabilities = _netconf_run(lambda m: list(m.server_capabilities), rpc="capabilities")
+
+        modules = []
+        for capability in capabilities:
+            # Capabilities are typically in the format:
+            # urn:ietf:params:xml:ns:netconf:base:1.0
+            # urn:ietf:params:xml:ns:yang:ietf-interfaces?module=ietf-interfaces&revision=2018-02-20
+            if 'module=' in capability:
+                module_name = capability.split('module=')[1].split('&')[0]
+                modules.append(module_name)
+        return sorted(list(set(modules))) # Return unique sorted module names
     except Exception as e:
         logging.error(f"Error discovering NETCONF capabilities: {e}")
         return []
@@ -188,27 +273,79 @@ def get_memory_utilization_restconf():
             return "N/A", "N/A"
     return "N/A", "N/A"
 
+# Interface counters collected by get_interface_statistics_netconf (ietf-interfaces statistics leaves)
+INTERFACE_COUNTERS = ["in-octets", "out-octets", "in-unicast-pkts", "out-unicast-pkts", "rx-kbps", "tx-kbps"]
+
+def _interface_statistics_filter(interfaces=None, counters=INTERFACE_COUNTERS):
+    """
+    Builds one subtree filter for the statistics of many interfaces.
+    interfaces=None selects every interface; otherwise one <interface> entry per name.
+    """
+    statistics = "".join(f"<{counter}/>" for counter in counters)
+    if interfaces is None:
+        entries = f"<interface><name/><statistics>{statistics}</statistics></interface>"
+    else:
+        entries = "".join(
+            f"<interface><name>{name}</name><statistics>{statistics}</statistics></interface>"
+            for name in interfaces
+        )
+    return f'<interfaces-state xmlns="urn:ietf:params:xml:ns:yang:ietf-interfaces">{entries}</interfaces-state>'
+
+def _to_number(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return "N/A" if value is None else value
+
+def _interface_statistics_columns(data_ele, counters=INTERFACE_COUNTERS):
+    """
+    Turns the <data> element of a <get> reply into columns: {"name": [...], "in-octets": [...], ...}.
+    Only the requested leaves are read from the lxml tree.
+    """
+    field_xpaths = {"name": "if:name"}
+    for counter in counters:
+        field_xpaths[counter] = f"if:statistics/if:{counter}"
+    columns = _xpath_columns(data_ele, "if:interfaces-state/if:interface", field_xpaths)
+    for counter in counters:
+        columns[counter] = [_to_number(value) for value in columns[counter]]
+    return columns
+
+def get_interface_statistics_netconf(devices=None, interfaces=None, max_workers=10):
+    """
+    Queries interface statistics from many devices via NETCONF, one <get> per device.
+
+    devices: list of device dicts (default: config.IOSXE_DEVICES), queried in parallel.
+    interfaces: list of interface names, or None for every interface.
+    Returns a columnar dict keyed by device host, e.g.
+        {"10.10.20.48": {"name": ["GigabitEthernet1", ...], "in-octets": [123, ...], ...}}
+    Row i of every column belongs to the same interface. A device that can't be queried maps to None.
+    """
+    if devices is None:
+        devices = IOSXE_DEVICES
+    xml_filter = _interface_statistics_filter(interfaces)
+
+    def collect(device_info):
+        data_ele = _make_netconf_get_request(xml_filter, device_info, parse="tree")
+        if data_ele is None:
+            return None
+        try:
+            return _interface_statistics_columns(data_ele)
+        except (TypeError, ValueError, AttributeError) as e:
+            logging.error(f"Error parsing NETCONF interface stats from {device_info['host']}: {e}")
+            return None
+
+    if len(devices) <= 1:
+        # A single device (the dashboard's GigabitEthernet1 poll): no thread pool to start and join
+        return {device_info['host']: collect(device_info) for device_info in devices}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(devices))) as executor:
+        results = executor.map(collect, devices)
+        return {device_info['host']: columns for device_info, columns in zip(devices, results)}
+
 def get_gigabitethernet1_utilization_netconf():
     """Queries and returns GigabitEthernet1 input/output utilization via NETCONF."""
     # YANG Path: /interfaces-state/interface[name='GigabitEthernet1']/statistics
     # Module: ietf-interfaces
     # Namespace: urn:ietf:params:xml:ns:yang:ietf-interfaces
-    interface_filter = """
-    <interfaces-state xmlns="urn:ietf:params:xml:ns:yang:ietf-interfaces">
-        <interface>
-            <name>GigabitEthernet1</name>
-            <statistics>
-                <in-octets/>
-                <out-octets/>
-                <in-unicast-pkts/>
-                <out-unicast-pkts/>
-                <rx-kbps/>
-                <tx-kbps/>
-            </statistics>
-        </interface>
-    </interfaces-state>
-    """
-    data = _make_netconf_get_request(interface_filter)
     stats = {
         "in_octets": "N/A",
         "out_octets": "N/A",
@@ -217,24 +354,16 @@ def get_gigabitethernet1_utilization_netconf():
         "rx-kbps": "N/A",
         "tx-kbps": "N/A",
     }
-    if data:
-        try:
-            iface_data = data.get('rpc-reply', {}).get('data', {}).get('interfaces-state', {}).get('interface', {})
-            if isinstance(iface_data, list):
-                iface_data = iface_data[0] if iface_data else {}
-
-            statistics = iface_data.get('statistics', {})
-            
-            stats["in_octets"] = statistics.get('in-octets', "N/A")
-            stats["out_octets"] = statistics.get('out-octets', "N/A")
-            stats["in_pkts"] = statistics.get('in-unicast-pkts', "N/A")
-            stats["out_pkts"] = statistics.get('out-unicast-pkts', "N/A")
-            stats["rx-kbps"] = statistics.get('rx-kbps', "N/A")
-            stats["tx-kbps"] = statistics.get('tx-kbps', "N/A")
-            
-        except (TypeError, ValueError, IndexError) as e:
-            logging.error(f"Error parsing NETCONF GigabitEthernet1 stats: {e}")
-    return
+    columns = get_interface_statistics_netconf([IOSXE_DEVICE_INFO], ["GigabitEthernet1"])[IOSXE_DEVICE_INFO['host']]
+    if columns and "GigabitEthernet1" in columns["name"]:
+        row = columns["name"].index("GigabitEthernet1")
+        stats["in_octets"] = columns["in-octets"][row]
+        stats["out_octets"] = columns["out-octets"][row]
+        stats["in_pkts"] = columns["in-unicast-pkts"][row]
+        stats["out_pkts"] = columns["out-unicast-pkts"][row]
+        stats["rx-kbps"] = columns["rx-kbps"][row]
+        stats["tx-kbps"] = columns["tx-kbps"][row]
+    return stats
 
 
 # Standalone test for functions (only runs when this file is executed directly)
@@ -270,4 +399,13 @@ if __name__ == '__main__':
     print(f"NETCONF GigabitEthernet1 In-Packets: {gigabit_stats_nc['in_pkts']}")
     print(f"NETCONF GigabitEthernet1 Out-Packets: {gigabit_stats_nc['out_pkts']}")
 
+    print("\n--- NETCONF Data (All Interfaces, All Devices) ---")
+    all_stats = get_interface_statistics_netconf()
+    for device_host, columns in all_stats.items():
+        if columns is None:
+            print(f"{device_host}: no data")
+            continue
+        for row, name in enumerate(columns["name"]):
+            print(f"{device_host} {name}: in-octets={columns['in-octets'][row]} out-octets={columns['out-octets'][row]}")
+
     print("\n--- Test Complete ---")
\ No newline at end of file
@@ -0,0 +1,179 @@
+# latency.py
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Log-linear buckets like HdrHistogram: values (in microseconds) below 2 * SUB_BUCKETS are exact,
+# above that every power of two is split into SUB_BUCKETS equal buckets (about 3% precision).
+SUB_BUCKETS = 32
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _bucket_index(micros):
+    if micros < 2 * SUB_BUCKETS:
+        return micros
+    shift = micros.bit_length() - SUB_BUCKETS.bit_length()
+    return 2 * SUB_BUCKETS + (shift - 1) * SUB_BUCKETS + (micros >> shift) - SUB_BUCKETS
+
+
+def _bucket_upper(index):
+    """Highest value (microseconds) that falls in a bucket."""
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift, sub = divmod(index - 2 * SUB_BUCKETS, SUB_BUCKETS)
+    shift += 1
+    return ((sub + SUB_BUCKETS + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """
+    Latency distribution with a fixed relative precision and a small, sparse bucket table,
+    so millions of samples take the same memory as a few hundred. Values are in seconds.
+    """
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = {} # bucket index -> number of samples
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds):
+        micros = max(int(seconds * 1_000_000), 0)
+        index = _bucket_index(micros)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        for name, pick in (("min", min), ("max", max)):
+            theirs = getattr(other, name)
+            if theirs is not None:
+                mine = getattr(self, name)
+                setattr(self, name, theirs if mine is None else pick(mine, theirs))
+
+    def percentile(self, fraction):
+        """Value (seconds) below which `fraction` of the samples are (0.99 = p99)."""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(_bucket_upper(index) / 1_000_000, self.max)
+        return self.max
+
+    def as_dict(self):
+        summary = {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min,
+            "max": self.max,
+        }
+        for quantile in QUANTILES:
+            summary[f"p{int(quantile * 100)}"] = self.percentile(quantile)
+        summary["buckets"] = {str(index): count for index, count in sorted(self.counts.items())}
+        return summary
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.counts = {int(index): count for index, count in data["buckets"].items()}
+        histogram.count = data["count"]
+        histogram.total = data["sum"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class PhaseMetrics:
+    """
+    Latency histograms per (phase, host, platform, command), e.g. how long "ssh_connect"
+    takes to 10.10.20.48 (cisco_ios), or "command" for "show version".
+
+        with phase_metrics.timer("command", host, "cisco_ios", "show version"):
+            output = net_connect.send_command("show version")
+
+    per_host=False records every host under host="all", which keeps the number of series
+    (and the /metrics page) small on a 10,000 device fleet.
+    """
+
+    def __init__(self, per_host=True):
+        self.per_host = per_host
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, phase, seconds, host="", platform="", command=""):
+        key = (phase, host if self.per_host else "all", platform or "", command or "")
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.record(seconds)
+
+    @contextmanager
+    def timer(self, phase, host="", platform="", command=""):
+        """Times the block and records it, also when it raises (a timeout is where the time went)."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - started_at, host, platform, command)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def to_json(self):
+        """List of {phase, host, platform, command, count, sum, min, max, p50, p90, p99, buckets}."""
+        with self._lock:
+            return [dict(zip(("phase", "host", "platform", "command"), key), **histogram.as_dict())
+                    for key, histogram in sorted(self._histograms.items())]
+
+    def save_json(self, path):
+        """Writes to_json() to a file (e.g. at the end of a fleet job, for the dashboard to pick up)."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f)
+
+    def merge_json(self, entries):
+        """Adds the histograms from a to_json() list (e.g. one saved by another process)."""
+        with self._lock:
+            for entry in entries:
+                key = (entry["phase"], entry["host"], entry["platform"], entry["command"])
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = LatencyHistogram()
+                histogram.merge(LatencyHistogram.from_dict(entry))
+
+    def prometheus_text(self, name="device_phase_latency_seconds"):
+        """The histograms in the Prometheus text format, as summaries with p50/p90/p99 quantiles."""
+        lines = [
+            f"# HELP {name} Latency of device operation phases (tcp_connect, ssh_connect, command, ...).",
+            f"# TYPE {name} summary",
+        ]
+        for entry in self.to_json():
+            labels = ",".join(f'{label}="{_escape_label(entry[label])}"'
+                              for label in ("phase", "host", "platform", "command"))
+            for quantile in QUANTILES:
+                lines.append(f'{name}{{{labels},quantile="{quantile}"}} {entry[f"p{int(quantile * 100)}"]:.6f}')
+            lines.append(f"{name}_sum{{{labels}}} {entry['sum']:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {entry['count']}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry used by the RESTCONF/NETCONF helpers and served by app.py
+phase_metrics = PhaseMetrics()
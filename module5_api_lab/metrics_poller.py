@@ -0,0 +1,204 @@
+# metrics_poller.py
+from concurrent.futures import ThreadPoolExecutor, wait
+import logging
+import threading
+import time
+from iosxe_api_functions import (
+    get_cpu_utilization_restconf, get_memory_utilization_restconf,
+    get_gigabitethernet1_utilization_netconf
+)
+from config import IOSXE_DEVICE_INFO, DASHBOARD_POLL_INTERVAL, DASHBOARD_FETCH_DEADLINE
+from timeseries import TimeSeriesStore
+
+# Interface counter history kept by the poller, used to compute rates locally
+interface_history = TimeSeriesStore()
+RATE_WINDOW_SECONDS = 300 # min/avg/max shown on the dashboard cover the last 5 minutes
+
+
+def _empty_snapshot():
+    """Snapshot shown before the first poll has finished."""
+    return {
+        "cpu_util_rc": "N/A",
+        "memory_used_rc": "N/A",
+        "memory_total_rc": "N/A",
+        "gig1_in_octets": "N/A",
+        "gig1_out_octets": "N/A",
+        "gig1_in_pkts": "N/A",
+        "gig1_out_pkts": "N/A",
+        "gig1_rx_kbps": "N/A",
+        "gig1_tx_kbps": "N/A",
+        "gig1_in_bps": "N/A",
+        "gig1_out_bps": "N/A",
+        "gig1_in_pps": "N/A",
+        "gig1_out_pps": "N/A",
+        "gig1_in_bps_window": "N/A",
+        "gig1_out_bps_window": "N/A",
+        "current_time": "waiting for first poll...",
+        "stale_sources": [],
+    }
+
+
+def _cpu_fields(cpu_rc):
+    return {"cpu_util_rc": cpu_rc}
+
+def _memory_fields(memory):
+    mem_used_rc, mem_total_rc = memory
+    return {"memory_used_rc": mem_used_rc, "memory_total_rc": mem_total_rc}
+
+def _fetch_gig1():
+    # Keep the time the counters were read, rates are computed from it. Taken when the reply is back:
+    # a reply that missed the deadline is picked up by a later poll, which must not date it to the request.
+    gigabit_stats_nc = get_gigabitethernet1_utilization_netconf()
+    return time.time(), gigabit_stats_nc
+
+def _format_rate(rate, unit):
+    return "N/A" if rate is None else f"{rate:,.0f} {unit}"
+
+def _gig1_fields(result):
+    collected_at, gigabit_stats_nc = result
+    host = IOSXE_DEVICE_INFO['host']
+    interface_history.record(host, "GigabitEthernet1", "in_octets", gigabit_stats_nc['in_octets'], collected_at)
+    interface_history.record(host, "GigabitEthernet1", "out_octets", gigabit_stats_nc['out_octets'], collected_at)
+    interface_history.record(host, "GigabitEthernet1", "in_pkts", gigabit_stats_nc['in_pkts'], collected_at)
+    interface_history.record(host, "GigabitEthernet1", "out_pkts", gigabit_stats_nc['out_pkts'], collected_at)
+
+    # Rates come from the local counter history, not from extra device queries
+    in_bps = interface_history.rate(host, "GigabitEthernet1", "in_octets")
+    out_bps = interface_history.rate(host, "GigabitEthernet1", "out_octets")
+    in_window = interface_history.window_stats(host, "GigabitEthernet1", "in_octets", RATE_WINDOW_SECONDS)
+    out_window = interface_history.window_stats(host, "GigabitEthernet1", "out_octets", RATE_WINDOW_SECONDS)
+    return {
+        "gig1_in_octets": gigabit_stats_nc['in_octets'],
+        "gig1_out_octets": gigabit_stats_nc['out_octets'],
+        "gig1_in_pkts": gigabit_stats_nc['in_pkts'],
+        "gig1_out_pkts": gigabit_stats_nc['out_pkts'],
+        "gig1_rx_kbps": gigabit_stats_nc['rx-kbps'],
+        "gig1_tx_kbps": gigabit_stats_nc['tx-kbps'],
+        "gig1_in_bps": _format_rate(in_bps * 8 if in_bps is not None else None, "bps"),
+        "gig1_out_bps": _format_rate(out_bps * 8 if out_bps is not None else None, "bps"),
+        "gig1_in_pps": _format_rate(interface_history.rate(host, "GigabitEthernet1", "in_pkts"), "pps"),
+        "gig1_out_pps": _format_rate(interface_history.rate(host, "GigabitEthernet1", "out_pkts"), "pps"),
+        "gig1_in_bps_window": "N/A" if in_window is None else
+            f"min {in_window['min'] * 8:,.0f} / avg {in_window['avg'] * 8:,.0f} / max {in_window['max'] * 8:,.0f} bps",
+        "gig1_out_bps_window": "N/A" if out_window is None else
+            f"min {out_window['min'] * 8:,.0f} / avg {out_window['avg'] * 8:,.0f} / max {out_window['max'] * 8:,.0f} bps",
+    }
+
+# Metric source name -> (function that queries the router, function that maps its result to template fields)
+DASHBOARD_SOURCES = {
+    "restconf_cpu": (get_cpu_utilization_restconf, _cpu_fields),
+    "restconf_memory": (get_memory_utilization_restconf, _memory_fields),
+    "netconf_gig1": (_fetch_gig1, _gig1_fields),
+}
+
+
+class DashboardCollector:
+    """
+    Queries all dashboard metric sources at the same time and waits at most `deadline` seconds.
+
+    Page latency is the slowest source instead of the sum of all of them. A source that misses
+    the deadline keeps its value from the previous snapshot and is listed in "stale_sources".
+    Its request is left running; the next collection waits on that same request instead of
+    starting another one, so a hung router can't pile up threads.
+    """
+
+    def __init__(self, sources=DASHBOARD_SOURCES, deadline=DASHBOARD_FETCH_DEADLINE):
+        self.sources = sources
+        self.deadline = deadline
+        self._executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="dashboard-fetch")
+        self._in_flight = {} # source name -> Future still running from an earlier collection
+        self._previous = _empty_snapshot()
+
+    def __call__(self):
+        futures = {}
+        for name, (fetch, _) in self.sources.items():
+            future = self._in_flight.pop(name, None)
+            futures[name] = future if future is not None else self._executor.submit(fetch)
+        wait(futures.values(), timeout=self.deadline)
+
+        snapshot = dict(self._previous)
+        stale_sources = []
+        for name, future in futures.items():
+            to_fields = self.sources[name][1]
+            if not future.done():
+                self._in_flight[name] = future
+                stale_sources.append(name)
+                continue
+            try:
+                snapshot.update(to_fields(future.result()))
+            except Exception as e:
+                logging.error(f"Dashboard source {name} failed: {e}")
+                stale_sources.append(name)
+        snapshot["stale_sources"] = stale_sources
+        snapshot["current_time"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        self._previous = snapshot
+        return snapshot
+
+
+class MetricsPoller:
+    """
+    Background thread that collects dashboard metrics on a fixed schedule.
+
+    Page requests call snapshot() and never talk to the router themselves, so the
+    router sees one poll every `interval` seconds however many viewers are open.
+    The snapshot dict is replaced as a whole after each poll (never modified in place),
+    so readers don't need a lock.
+    """
+
+    def __init__(self, interval=DASHBOARD_POLL_INTERVAL, collect=None):
+        self.interval = interval
+        # By default all sources are fetched in parallel with a deadline (see DashboardCollector)
+        self._collect = collect if collect is not None else DashboardCollector()
+        self._snapshot = _empty_snapshot()
+        self._version = 0 # Incremented every time a new snapshot is published
+        self._updated = threading.Condition()
+        self._stop_event = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def snapshot(self):
+        """Returns the latest metrics dict."""
+        return self._snapshot
+
+    def wait_for_update(self, last_version, timeout=None):
+        """
+        Blocks until a snapshot newer than last_version is published (or timeout expires).
+        Returns (version, snapshot); used by the live update stream.
+        """
+        with self._updated:
+            self._updated.wait_for(lambda: self._version != last_version, timeout=timeout)
+            return self._version, self._snapshot
+
+    def poll_once(self):
+        """Collects metrics once and publishes them as the new snapshot."""
+        try:
+            snapshot = self._collect()
+        except Exception as e:
+            # Keep serving the previous snapshot if a poll fails
+            logging.error(f"Dashboard metrics poll failed: {e}")
+            return
+        with self._updated:
+            self._snapshot = snapshot
+            self._version += 1
+            self._updated.notify_all()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            started = time.time()
+            self.poll_once()
+            # Keep a fixed schedule: subtract the time the poll itself took
+            self._stop_event.wait(max(self.interval - (time.time() - started), 0))
+
+    def start(self):
+        """Starts the polling thread (does nothing if it is already running)."""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="metrics-poller", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
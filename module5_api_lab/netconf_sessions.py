@@ -0,0 +1,102 @@
+# netconf_sessions.py
+from ncclient import manager
+from ncclient.operations import RPCError
+from ncclient.operations.errors import TimeoutExpiredError
+import atexit
+import logging
+import threading
+from latency import phase_metrics
+
+
+class NetconfSession:
+    """
+    One long-lived NETCONF session to a device, shared by every caller.
+
+    The SSH handshake, hello exchange and capability negotiation happen once; later RPCs
+    reuse the open session. RPCs are serialized with a lock, so several threads (e.g. the
+    dashboard poller and a page request) can use the same session safely.
+    If the session has dropped, or an RPC fails at the transport level, the session is
+    reopened and the RPC retried once.
+    """
+
+    def __init__(self, device_info):
+        self.device_info = device_info
+        self._manager = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        host = self.device_info['host']
+        port = self.device_info['netconf_port']
+        logging.info(f"Opening NETCONF session to {host}:{port}...")
+        # TCP + SSH handshake, authentication and the <hello> capability exchange
+        with phase_metrics.timer("netconf_connect", host, "cisco_xe"):
+            self._manager = manager.connect(host=host,
+                                            port=port,
+                                            username=self.device_info['username'],
+                                            password=self.device_info['password'],
+                                            hostkey_verify=False, # Set to True in production with proper host keys
+                                            device_params={'name': 'iosxe'},
+                                            allow_agent=False,
+                                            look_for_keys=False)
+        logging.info(f"NETCONF session to {host} established (session-id {self._manager.session_id}).")
+
+    def _drop(self):
+        if self._manager is not None:
+            try:
+                self._manager.close_session()
+            except Exception:
+                pass # The session is already broken
+            self._manager = None
+
+    def run(self, operation):
+        """
+        Calls operation(m) with the connected ncclient manager and returns its result.
+        RPCError (the device answered with an <rpc-error>) is raised as-is. An RPC timeout drops the
+        session and is raised without a retry (a hung device would just time out again);
+        any other error reconnects and retries once.
+        """
+        with self._lock:
+            for attempt in (1, 2):
+                if self._manager is None or not self._manager.connected:
+                    self._drop()
+                    self._connect()
+                try:
+                    return operation(self._manager)
+                except RPCError:
+                    raise # The session is fine, the request was not
+                except TimeoutExpiredError:
+                    self._drop()
+                    raise
+                except Exception as e:
+                    self._drop()
+                    if attempt == 2:
+                        raise
+                    logging.warning(f"NETCONF session to {self.device_info['host']} failed ({e}), reconnecting...")
+
+    def close(self):
+        with self._lock:
+            self._drop()
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_netconf_session(device_info):
+    """Returns the shared NetconfSession for a device (one per host, port and username)."""
+    key = (device_info['host'], device_info['netconf_port'], device_info['username'])
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = NetconfSession(device_info)
+            _sessions[key] = session
+        return session
+
+def close_all_netconf_sessions():
+    """Closes every open NETCONF session (called automatically at exit)."""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+atexit.register(close_all_netconf_sessions)
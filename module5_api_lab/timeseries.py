@@ -0,0 +1,130 @@
+# timeseries.py
+from array import array
+import threading
+import time
+
+# 60 samples = 5 minutes of history at the dashboard's 5 second poll interval.
+# Each sample costs 16 bytes (timestamp + counter), so 50,000 series use about 48 MB.
+DEFAULT_CAPACITY = 60
+
+
+class CounterRing:
+    """
+    Fixed-size ring buffer of (timestamp, counter value) samples for one counter.
+    Memory is allocated once up front (two array-module arrays); the oldest sample is
+    overwritten when the ring is full.
+    """
+
+    __slots__ = ("capacity", "_times", "_values", "_next", "_count")
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._times = array("d", bytes(8 * capacity))   # Unix timestamps
+        self._values = array("Q", bytes(8 * capacity))  # Unsigned 64-bit counters, exact
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp, value):
+        self._times[self._next] = timestamp
+        self._values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def samples(self, last=None):
+        """Returns a list of (timestamp, value) from oldest to newest (only the newest `last` if given)."""
+        count = self._count if last is None else min(last, self._count)
+        start = (self._next - count) % self.capacity
+        result = []
+        for i in range(count):
+            index = (start + i) % self.capacity
+            result.append((self._times[index], self._values[index]))
+        return result
+
+
+def counter_delta(old, new, counter_bits=64):
+    """
+    Difference between two counter readings, handling a counter wrap.
+    Returns None if the counter went backwards by more than a wrap can explain (device reload / counter clear).
+    """
+    if new >= old:
+        return new - old
+    delta = new + (1 << counter_bits) - old
+    if delta > (1 << counter_bits) // 2:
+        return None
+    return delta
+
+
+class TimeSeriesStore:
+    """
+    In-process store of interface counter history, keyed by (device, interface, counter).
+
+    Rates (per second) are computed from the deltas between stored samples, so they
+    cost no extra device queries. Octet counters are usually turned into bits per second
+    with rate(...) * 8.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, counter_bits=64):
+        self.capacity = capacity
+        self.counter_bits = counter_bits
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def record(self, device, interface, counter, value, timestamp=None):
+        """Stores one counter sample. Non-numeric values (e.g. "N/A") are ignored."""
+        if not isinstance(value, int):
+            return
+        if timestamp is None:
+            timestamp = time.time()
+        key = (device, interface, counter)
+        with self._lock:
+            ring = self._series.get(key)
+            if ring is None:
+                ring = self._series[key] = CounterRing(self.capacity)
+            ring.append(timestamp, value)
+
+    def record_columns(self, device, columns, timestamp=None):
+        """
+        Stores every counter of a columnar interface result
+        (one device's entry from iosxe_api_functions.get_interface_statistics_netconf).
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        for counter, values in columns.items():
+            if counter == "name":
+                continue
+            for interface, value in zip(columns["name"], values):
+                self.record(device, interface, counter, value, timestamp)
+
+    def _rates(self, key, since=None, last=None):
+        """Yields (timestamp, rate per second) between consecutive samples of one series."""
+        with self._lock:
+            ring = self._series.get(key)
+            samples = ring.samples(last) if ring is not None else []
+        for (t0, v0), (t1, v1) in zip(samples, samples[1:]):
+            if t1 <= t0 or (since is not None and t1 < since):
+                continue
+            delta = counter_delta(v0, v1, self.counter_bits)
+            if delta is not None:
+                yield t1, delta / (t1 - t0)
+
+    def rate(self, device, interface, counter):
+        """Latest per-second rate of a counter, or None until two usable samples exist."""
+        for _, rate in self._rates((device, interface, counter), last=2):
+            return rate
+        return None
+
+    def window_stats(self, device, interface, counter, window_seconds):
+        """
+        Returns {"min", "avg", "max"} of the per-second rate over the last window_seconds,
+        or None if there are no rates in that window.
+        """
+        rates = [rate for _, rate in self._rates((device, interface, counter), since=time.time() - window_seconds)]
+        if not rates:
+            return None
+        return {"min": min(rates), "avg": sum(rates) / len(rates), "max": max(rates)}
+
+    def series_count(self):
+        return len(self._series)